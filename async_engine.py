@@ -0,0 +1,387 @@
+import asyncio
+import random
+import time
+import logging
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+    NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+    NETWORK_ERRORS = (asyncio.TimeoutError,)
+
+import dc_library_scaper as dc
+import smithsonian_scraper as si
+from http_cache import get_default_cache
+from http_client import (
+    USER_AGENT, ACCEPT_ENCODING, MAX_RETRIES, BACKOFF_FACTOR, BACKOFF_MAX,
+    BACKOFF_JITTER, RETRY_STATUSES
+)
+from price_cache import get_default_price_cache
+from rss_stream import iter_rss_items
+from feed_planner import shard_url, merge_shards
+from metrics import metrics
+
+log = logging.getLogger("async_engine")
+
+# Connections the one session keeps open across every host
+MAX_CONNECTIONS = 64
+# Price pages in flight at once, the per-domain rate limiter still paces each host
+MAX_PRICE_REQUESTS = 32
+# Threads parsing feeds and pages off the event loop
+PARSE_WORKERS = 4
+REQUEST_TIMEOUT = 30
+
+"""
+Raised for a response that is not a 200 once retries are used up
+"""
+class FetchError(Exception):
+    def __init__(self, url, status):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+def _require_aiohttp():
+    if not AIOHTTP_AVAILABLE:
+        raise RuntimeError("The async engine needs aiohttp, install it with 'pip install aiohttp'")
+
+"""
+Opens the aiohttp session the engine shares between every request. The
+connector caps requests per host as the threaded scrapers' host semaphores do
+"""
+def open_session(max_connections=MAX_CONNECTIONS):
+    _require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=max_connections, limit_per_host=dc.MAX_REQUESTS_PER_HOST),
+        headers={
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': ACCEPT_ENCODING,
+        },
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    )
+
+# Exponential backoff plus random jitter, as the threaded session's retry policy
+def _backoff(attempt):
+    return min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER))
+
+"""
+Conditional GET through the shared HTTP cache, retrying connection errors
+and the statuses the threaded session retries
+Returns the FetchedResponse
+"""
+async def fetch(session, url, headers=None, source=None, location=None):
+    for attempt in range(MAX_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            response = await get_default_cache().get_async(session, url, headers=headers)
+        except NETWORK_ERRORS as e:
+            if attempt == MAX_RETRIES:
+                raise
+            log.debug("Retrying %s after error: %s", url, e)
+        else:
+            metrics.observe("fetch", time.perf_counter() - started, source, location)
+            metrics.count_response(response, source, location)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            log.debug("Retrying %s after HTTP %s", url, response.status_code)
+        await asyncio.sleep(_backoff(attempt))
+
+def _check(response):
+    if response.status_code != 200:
+        raise FetchError(response.url, response.status_code)
+    return response
+
+def _in_executor(func, *args):
+    return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+# Waits up to deadline for every awaitable in tasks, a dict keyed by name
+# Returns {name: result} for the ones that finished, cancelling the rest
+async def _gather_within(tasks, deadline, what):
+    futures = {key: asyncio.ensure_future(task) for key, task in tasks.items()}
+    if not futures:
+        return {}
+    done, pending = await asyncio.wait(futures.values(), timeout=deadline)
+    results = {}
+    for key, future in futures.items():
+        if future in pending:
+            log.warning("Deadline of %ss reached, dropping %s: %s", deadline, what, key)
+            future.cancel()
+        elif future.exception() is not None:
+            log.error("Error scraping %s %s: %s", what, key, future.exception())
+        else:
+            results[key] = future.result()
+    return results
+
+def _parse_dc_feed(content, location):
+    try:
+        with metrics.stage("xml_parse", dc.SOURCE_NAME, location):
+            return list(iter_rss_items([content]))
+    except ET.ParseError as e:
+        log.warning("Streaming RSS parse failed, parsing the full feed instead: %s", e)
+        return dc.parse_feed_body(content, location)[1]
+
+# Fetches and parses one location's feed for one audience
+# Returns (rss_url, items), or None if the feed could not be read
+async def _fetch_location(session, location, kid_friendly):
+    rss_url = dc.location_feed_url(location, kid_friendly)
+    log.info("Fetching RSS feed: %s", rss_url)
+    try:
+        response = _check(await fetch(session, rss_url, dc.RSS_HEADERS, dc.SOURCE_NAME, location))
+        items = await _in_executor(_parse_dc_feed, response.content, location)
+    except NETWORK_ERRORS + (FetchError,) as e:
+        log.error("Network error fetching RSS feed: %s", rss_url)
+        log.debug("%s", e)
+        return None
+    except Exception:
+        log.error("Error parsing RSS feed: %s", rss_url)
+        log.debug("Full traceback:", exc_info=True)
+        return None
+    log.info("RSS feed fetched successfully: Found %s items", len(items))
+    return rss_url, items
+
+# Parses the fetched feeds of one audience in the executor, keyed by location
+def _parse_locations(feeds, locations, kid_friendly, title_set, scraped_at, seen_index):
+    feeds = {location: feeds.get((location, kid_friendly)) for location in locations}
+    return _in_executor(dc.parse_locations, feeds, locations, kid_friendly, title_set, scraped_at, seen_index)
+
+"""
+Async counterpart of dc_library_scaper.scrape_dc_library_rss: every
+location's feed is in flight at once on the session
+Returns list of Workshop records in library_location_codes order
+"""
+async def scrape_dc_library_rss_async(session, kid_friendly=False, title_set=None, locations=None,
+                                      scraped_at=None, seen_index=None, deadline=dc.FETCH_DEADLINE):
+    scraped_at = scraped_at or datetime.now().isoformat()
+    locations = list(locations) if locations is not None else list(dc.library_location_codes.keys())
+    feeds = await _gather_within(
+        {(location, kid_friendly): _fetch_location(session, location, kid_friendly) for location in locations},
+        deadline, "location")
+    results = await _parse_locations(feeds, locations, kid_friendly, title_set, scraped_at, seen_index)
+
+    workshops = []
+    for location in locations:
+        workshops.extend(results.get(location, []))
+    return workshops
+
+"""
+Scrapes both audiences of every location, fetching all of the feeds at once.
+Kid events come first, then adult events not already listed for kids, as in
+dc_library_scaper.scrape_dc_library
+Returns list of Workshop records, empty when a sink is given
+"""
+async def scrape_dc_library_async(session, seen_index=None, sink=None, deadline=dc.FETCH_DEADLINE):
+    scraped_at = datetime.now().isoformat()
+    locations = list(dc.library_location_codes.keys())
+    workshops = []
+    emit = sink.write if sink is not None else workshops.append
+
+    feeds = await _gather_within(
+        {(location, kid_friendly): _fetch_location(session, location, kid_friendly)
+         for kid_friendly in (True, False) for location in locations},
+        deadline, "location")
+
+    title_set = None
+    for kid_friendly in (True, False):
+        results = await _parse_locations(feeds, locations, kid_friendly, title_set, scraped_at, seen_index)
+        audience_titles = dc.emit_locations(results, locations, emit)
+        if kid_friendly:
+            title_set = audience_titles
+    return workshops
+
+async def _fetch_rate_limited(session, url):
+    for attempt in range(si.MAX_FETCH_ATTEMPTS):
+        await si.price_rate_limiter.acquire_async(url)
+        response = await fetch(session, url, si.PRICE_PAGE_HEADERS, si.SOURCE_NAME)
+        delay = si.retry_delay(response)
+        if delay is None:
+            return response
+        si.price_rate_limiter.defer(url, delay)
+    return response
+
+async def _scrape_price(session, job, slots):
+    scraper, url = job
+    if scraper not in si.PRICE_PAGES:
+        return await _in_executor(scraper, url)
+    accepts, parse_page = si.PRICE_PAGES[scraper]
+    if not accepts(url):
+        return ""
+
+    cached = si.cached_price(url)
+    if cached is not None:
+        return cached
+
+    async with slots:
+        si.item_log.debug("Checking website for price: %s...", url[:60])
+        try:
+            response = _check(await _fetch_rate_limited(session, url))
+        except NETWORK_ERRORS + (FetchError,) as e:
+            log.warning("Error fetching price page %s: %s", url, e)
+            return ""
+    try:
+        price, pattern = await _in_executor(parse_page, response.content)
+    except Exception as e:
+        log.warning("Error parsing price page %s: %s", url, e)
+        return ""
+    get_default_price_cache().store(url, price, pattern)
+    return price
+
+"""
+Async counterpart of smithsonian_scraper.resolve_prices, keeping up to
+max_requests price pages in flight
+Returns {price_job: price}
+"""
+async def resolve_prices_async(session, price_jobs, max_requests=MAX_PRICE_REQUESTS):
+    unique_jobs = list(dict.fromkeys(price_jobs))
+    if not unique_jobs:
+        return {}
+
+    log.info("Resolving %s price pages", len(unique_jobs))
+    slots = asyncio.Semaphore(max(1, max_requests))
+    results = await asyncio.gather(*[_scrape_price(session, job, slots) for job in unique_jobs],
+                                   return_exceptions=True)
+    prices = {}
+    for job, result in zip(unique_jobs, results):
+        if isinstance(result, Exception):
+            log.warning("Error scraping price from %s: %s", job[1], result)
+            continue
+        prices[job] = result
+    return prices
+
+def _read_smithsonian_feed(response):
+    try:
+        return list(metrics.timed_iter(iter_rss_items([response.content]), "xml_parse", si.SOURCE_NAME))
+    except ET.ParseError as e:
+        log.warning("Streaming RSS parse failed, parsing the full feed instead: %s", e)
+        with metrics.stage("xml_parse", si.SOURCE_NAME):
+            return si._parse_feed(response)
+
+async def _fetch_smithsonian_feed(session, rss_url):
+    response = _check(await fetch(session, rss_url, si.RSS_HEADERS, si.SOURCE_NAME))
+    return await _in_executor(_read_smithsonian_feed, response)
+
+# Async counterpart of smithsonian_scraper.fetch_shard_items
+async def _fetch_shard(session, shard):
+    items = await _fetch_smithsonian_feed(session, shard_url(si.RSS_URL, shard))
+    halves = si.truncated_shard_halves(shard, items)
+    if halves:
+        halves = await asyncio.gather(*[_fetch_shard(session, half) for half in halves])
+        return [item for half in halves for item in half]
+    return items
+
+# Async counterpart of smithsonian_scraper.fetch_sharded_items, every shard in flight at once
+async def _fetch_sharded(session, horizon_days, shard_size):
+    shards = si.plan_feed_shards(horizon_days, shard_size)
+    results = await asyncio.gather(*[_fetch_shard(session, shard) for shard in shards], return_exceptions=True)
+    shard_items = [si.shard_result(shard, result) for shard, result in zip(shards, results)]
+    return list(merge_shards([items for items in shard_items if items is not None]))
+
+"""
+Async counterpart of smithsonian_scraper.scrape_smithsonian_rss
+Returns list of Workshop records, empty when a sink is given
+"""
+async def scrape_smithsonian_rss_async(session, seen_index=None, sink=None, max_price_requests=MAX_PRICE_REQUESTS,
+                                       horizon_days=si.HORIZON_DAYS, shard_size=si.SHARD_SIZE):
+    rss_url = si.RSS_URL
+    scraped_at = datetime.now().isoformat()
+    workshops = []
+    emit = sink.write if sink is not None else workshops.append
+
+    try:
+        log.info("Fetching Smithsonian RSS feed...")
+        if horizon_days:
+            items = await _fetch_sharded(session, horizon_days, shard_size)
+        else:
+            items = await _fetch_smithsonian_feed(session, rss_url)
+        filters = si.smithsonian_filters(seen_index, horizon_days)
+        parsed = await _in_executor(si._parse_items, items, rss_url, scraped_at, seen_index,
+                                    0, si.PARSE_CHUNK_SIZE, filters)
+
+        started = time.perf_counter()
+        scraped_prices = await resolve_prices_async(
+            session, [price_job for _, _, price_job in parsed if price_job], max_price_requests)
+        metrics.observe("price_scrape", time.perf_counter() - started, si.SOURCE_NAME)
+
+        emitted = si.emit_workshops(parsed, scraped_prices, emit)
+        log.info("Extracted %s future workshops from Smithsonian RSS", emitted)
+
+    except NETWORK_ERRORS + (FetchError,) as e:
+        log.warning("Error fetching RSS feed: %s", e)
+    except Exception as e:
+        log.warning("Error parsing RSS feed: %s", e)
+        log.debug("Full traceback:", exc_info=True)
+
+    return workshops
+
+# Async scrapers by source name, each called as scraper(session, seen_index=, sink=)
+ASYNC_SCRAPERS = {
+    dc.SOURCE_NAME: scrape_dc_library_async,
+    si.SOURCE_NAME: scrape_smithsonian_rss_async,
+}
+
+"""
+Runs one async scraper to completion on a fresh event loop and session, for
+callers without a loop of their own, e.g. run(scrape_smithsonian_rss_async, sink=sink)
+"""
+def run(scraper, **kwargs):
+    _require_aiohttp()
+
+    async def _main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=PARSE_WORKERS))
+        async with open_session() as session:
+            return await scraper(session, **kwargs)
+
+    return asyncio.run(_main())
+
+async def _run_source(session, name, source, sink, seen_index, max_workers, timeout, fallback_executor):
+    scraper = ASYNC_SCRAPERS.get(name)
+    if scraper is None:
+        # Sources without an async scraper run their threaded one in a process
+        # of its own beside the loop, killed if it overruns its timeout
+        import run_scrapers
+        results = await asyncio.get_running_loop().run_in_executor(
+            fallback_executor, run_scrapers.run_in_processes, {name: source}, {name: sink}, seen_index, max_workers, {name: timeout})
+        return results[name]
+
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(scraper(session, seen_index=seen_index, sink=sink), timeout)
+    except asyncio.TimeoutError:
+        log.warning("Source %s timed out after %ss, keeping the workshops it produced", name, timeout)
+        return {'status': 'timeout', 'workshops': sink.count, 'seconds': timeout}
+    except Exception as e:
+        log.error("Source %s failed: %s", name, e)
+        return {'status': 'error', 'workshops': sink.count, 'seconds': None}
+    finally:
+        sink.close()
+    return {'status': 'ok', 'workshops': sink.count, 'seconds': round(time.perf_counter() - started, 3)}
+
+"""
+Runs the named sources on one event loop, sharing a single session, as the
+async backend of run_scrapers.run_sources. sources and sinks are keyed by name
+Returns {source name: {'status', 'workshops', 'seconds'}}
+"""
+def run_sources(sources, sinks, seen_index=None, max_workers=None, timeouts=None):
+    _require_aiohttp()
+    timeouts = timeouts or {}
+
+    async def _main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=PARSE_WORKERS))
+        fallback_executor = ThreadPoolExecutor(max_workers=max(1, len(sources)))
+        try:
+            async with open_session() as session:
+                results = await asyncio.gather(*[
+                    _run_source(session, name, source, sinks[name], seen_index, max_workers,
+                                timeouts.get(name, source.timeout), fallback_executor)
+                    for name, source in sources.items()
+                ])
+        finally:
+            fallback_executor.shutdown(wait=False, cancel_futures=True)
+        return dict(zip(sources, results))
+
+    return asyncio.run(_main())
@@ -0,0 +1,111 @@
+"""
+Micro-benchmarks the date_parsing fast path against the original
+strptime fallback cascades, per item, with and without the memo.
+
+Usage: python benchmarks/bench_date_parsing.py
+"""
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import date_parsing
+
+ITERATIONS = 2000
+
+DC_SAMPLES = [
+    "Knitting Circle Saturday, October 18, 2025 at 2:00 PM Join us in the craft room",
+    "Teen Zine Workshop 10/21/2025 4pm All supplies provided",
+    "Makers Lab Tuesday Nov 4 2025 from 6:30pm to 8pm",
+    "Writing Group 2025-12-02 10:00 am in the reading room",
+    "Drop-in crafts every week, registration not required",
+]
+SMITHSONIAN_SAMPLES = [
+    "Saturday, October 18, 2025, 10 – 11:30am",
+    "Thursday, November 6, 2025, 6:45 – 8:45pm",
+    "Sunday, December 7, 2025, 1pm",
+]
+
+def legacy_parse_date(date_text):
+    date_patterns = [
+        r'(\w+\s+\d{1,2},?\s+\d{4})',
+        r'(\d{1,2}/\d{1,2}/\d{2,4})',
+        r'(\d{1,2}-\d{1,2}-\d{2,4})',
+        r'(\d{4}-\d{1,2}-\d{1,2})'
+    ]
+    formats = ['%B %d, %Y', '%b %d, %Y', '%B %d %Y', '%b %d %Y', '%m/%d/%Y', '%m/%d/%y',
+               '%m-%d-%Y', '%m-%d-%y', '%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']
+    for pattern in date_patterns:
+        for match in re.findall(pattern, date_text, re.IGNORECASE):
+            for fmt in formats:
+                try:
+                    parsed_date = datetime.strptime(match.strip(), fmt)
+                    if parsed_date.year < 1970:
+                        parsed_date = parsed_date.replace(year=parsed_date.year + 100)
+                    return parsed_date.date()
+                except ValueError:
+                    continue
+    return None
+
+def legacy_parse_time(text):
+    time_part = ""
+    for pattern in [r'(\d{1,2}:\d{2}\s*(?:am|pm|AM|PM))', r'(\d{1,2}\s*(?:am|pm|AM|PM))', r'(\d{1,2}:\d{2})']:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            time_part = match.group(1).strip()
+            break
+    for fmt in ["%I:%M %p", "%I:%M%p", "%I %p", "%I%p"]:
+        try:
+            return datetime.strptime(time_part, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+def legacy_time_range(text):
+    match = re.search(r"(\d{1,2}(?::\d{2})?)\s*(am|pm)?\s*[–-]\s*(\d{1,2}(?::\d{2})?)\s*(am|pm)", text, re.I)
+    if not match:
+        return None, None
+    start_raw, start_meridiem, end_raw, end_meridiem = match.groups()
+    start_meridiem = start_meridiem or end_meridiem
+    start = datetime.strptime(f"{start_raw} {start_meridiem.lower()}", "%I:%M %p" if ":" in start_raw else "%I %p")
+    end = datetime.strptime(f"{end_raw} {end_meridiem.lower()}", "%I:%M %p" if ":" in end_raw else "%I %p")
+    return start.time(), end.time()
+
+def bench(name, func, samples):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        results = [func(sample) for sample in samples]
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<10} {elapsed / (ITERATIONS * len(samples)) * 1e6:8.2f} us/item")
+    return results
+
+def compare(title, cases):
+    print(title)
+    results = {name: bench(name, func, samples) for name, func, samples in cases}
+    legacy, *others = results.values()
+    for name, result in list(results.items())[1:]:
+        agree = sum(a == b for a, b in zip(legacy, result))
+        print(f"  {name} agrees with legacy on {agree}/{len(legacy)} samples")
+
+def main():
+    compare("DC library date", [
+        ("legacy", legacy_parse_date, DC_SAMPLES),
+        ("uncached", date_parsing.find_date.__wrapped__, DC_SAMPLES),
+        ("memoized", date_parsing.find_date, DC_SAMPLES),
+    ])
+    compare("DC library time", [
+        ("legacy", legacy_parse_time, DC_SAMPLES),
+        ("uncached", date_parsing.find_time.__wrapped__, DC_SAMPLES),
+        ("memoized", date_parsing.find_time, DC_SAMPLES),
+    ])
+    compare("Smithsonian time range", [
+        ("legacy", legacy_time_range, SMITHSONIAN_SAMPLES),
+        ("uncached", date_parsing.find_time_range.__wrapped__, SMITHSONIAN_SAMPLES),
+        ("memoized", date_parsing.find_time_range, SMITHSONIAN_SAMPLES),
+    ])
+
+if __name__ == "__main__":
+    main()
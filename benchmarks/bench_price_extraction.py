@@ -0,0 +1,87 @@
+"""
+Compares the precompiled price extraction engine against the original
+per-pattern re.search loop.
+
+Usage: python benchmarks/bench_price_extraction.py [saved_page.html ...]
+With no pages given, benchmarks/pages/*.html is used, then synthetic pages
+"""
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from event_description import html_to_text
+from price_extraction import gen_admission_patterns, price_patterns, associates_price_extractor
+
+ITERATIONS = 20
+
+def legacy_find_associates_price(page_text):
+    for pattern in gen_admission_patterns:
+        match = re.search(pattern, page_text, re.I)
+        if match:
+            return match.group(1)
+    for pattern, result in price_patterns:
+        match = re.search(pattern, page_text, re.I)
+        if match:
+            price = result(match) if callable(result) else result
+            return price.replace('$', '')
+    dollar_matches = re.findall(r'\$(\d+(?:\.\d{2})?)', page_text)
+    reasonable_prices = [float(p) for p in dollar_matches if 5 <= float(p) <= 200]
+    if reasonable_prices:
+        price_val = reasonable_prices[0]
+        return f"{price_val:.0f}" if price_val == int(price_val) else f"{price_val}"
+    return None
+
+def engine_find_associates_price(page_text):
+    return associates_price_extractor.extract(page_text)[0]
+
+def synthetic_pages():
+    filler = "Join our expert lecturer for an evening exploring the history of the collection. " * 400
+    return [
+        f"<html><body><p>{filler}</p><p>Tickets</p><p>Members $25 Gen. Admission $35</p><p>{filler}</p></body></html>",
+        f"<html><body><p>{filler}</p><p>This event is free of charge.</p></body></html>",
+        f"<html><body><p>{filler}</p><p>Ticket price $40 per person</p><p>{filler}</p></body></html>",
+        f"<html><body><p>{filler} admission {filler}</p><p>Sold out</p></body></html>",
+    ]
+
+def load_pages(paths):
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "*.html")))
+    if not paths:
+        print("No saved pages found, using synthetic pages")
+        return synthetic_pages()
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+def time_it(find_price, texts):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        results = [find_price(text) for text in texts]
+    return time.perf_counter() - start, results
+
+def main():
+    texts = [html_to_text(page).lower() for page in load_pages(sys.argv[1:])]
+    total_chars = sum(len(text) for text in texts)
+    print(f"{len(texts)} pages, {total_chars} characters, {ITERATIONS} iterations")
+
+    legacy_time, legacy_results = time_it(legacy_find_associates_price, texts)
+    engine_time, engine_results = time_it(engine_find_associates_price, texts)
+
+    per_page = ITERATIONS * len(texts)
+    print(f"legacy: {legacy_time:.3f}s ({legacy_time / per_page * 1000:.3f} ms/page)")
+    print(f"engine: {engine_time:.3f}s ({engine_time / per_page * 1000:.3f} ms/page)")
+    print(f"speedup: {legacy_time / engine_time:.1f}x")
+
+    mismatches = [(i, a, b) for i, (a, b) in enumerate(zip(legacy_results, engine_results)) if a != b]
+    print(f"agreement: {len(texts) - len(mismatches)}/{len(texts)}")
+    for i, legacy, engine in mismatches:
+        print(f"  page {i}: legacy={legacy!r} engine={engine!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Offline benchmark suite for both scrapers. Every request goes through
+replay.FixtureAdapter, so nothing touches the network: recorded fixtures are
+served when --fixtures is given, synthetic libnet and Trumba feeds otherwise.
+Reports items/second and peak traced memory per benchmark, and compares
+against a saved baseline to catch regressions on the hot paths.
+
+Usage:
+    python benchmarks/bench_scrapers.py [--sizes 10000 100000] [--fixtures DIR]
+                                        [--only NAME ...] [--no-memory]
+                                        [--save results.json] [--baseline results.json]
+    python benchmarks/bench_scrapers.py --record DIR    # save live responses as fixtures
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import http_cache
+import price_cache
+import http_client
+import rate_limiter
+import dc_library_scaper
+import smithsonian_scraper
+from metrics import metrics
+import replay
+
+DEFAULT_SIZES = [10000]
+# Slowdown against the baseline, in items/second, reported as a regression
+REGRESSION_THRESHOLD = 0.2
+# Hosts serving the feeds, any other recorded page is an event website
+FEED_HOSTS = {urlparse(dc_library_scaper.FEED_URL).netloc, urlparse(smithsonian_scraper.RSS_URL).netloc}
+
+"""
+Points the shared caches at a fresh temporary directory and lifts the price
+page rate limit, so every run starts cold and measures parsing, not sleeping
+"""
+@contextlib.contextmanager
+def fresh_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        http_cache._default_cache = http_cache.HttpCache(os.path.join(tmp, "http.sqlite"))
+        price_cache._default_price_cache = price_cache.PriceCache(os.path.join(tmp, "price.sqlite"))
+        smithsonian_scraper.price_rate_limiter = rate_limiter.RateLimiter(rate=1e9, burst=1e9)
+        try:
+            yield
+        finally:
+            http_cache._default_cache.close()
+            http_cache._default_cache = None
+            price_cache._default_price_cache.close()
+            price_cache._default_price_cache = None
+
+def measure(func, memory):
+    with fresh_state():
+        start = time.perf_counter()
+        items = func()
+        seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        with fresh_state():
+            tracemalloc.start()
+            try:
+                func()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return items, seconds, peak
+
+"""
+Returns the feed items a scraper looked at since the last metrics.reset()
+"""
+def items_seen(source):
+    return sum(n for (name, counter_source, _, _), n in metrics.snapshot()[1].items()
+               if name == 'items_seen' and counter_source == source)
+
+"""
+Returns {name: callable returning the number of items processed} for a
+synthetic feed size. The price benchmarks fetch the price pages recorded in
+adapter's fixtures, or synthetic ones when none were recorded
+"""
+def benchmarks(size, synthetic, adapter):
+    locations = len(dc_library_scaper.library_location_codes)
+    synthetic.libnet_items = max(2, size // locations)
+    synthetic.trumba_items = size
+
+    descriptions = [replay.trumba_description(i, random.Random(i))[0] for i in range(min(size, 10000))]
+    recorded = adapter.recorded_urls()
+    associates_urls = [url for url in recorded if smithsonian_scraper.is_associates_page(url)] or [
+        f"https://smithsonianassociates.org/ticketing/tickets/{page}" for page in range(replay.PRICE_PAGES)]
+    website_urls = [url for url in recorded
+                    if urlparse(url).netloc not in FEED_HOSTS and not smithsonian_scraper.is_associates_page(url)] or [
+        f"https://www.si.example/events/{page}" for page in range(replay.PRICE_PAGES)]
+
+    def dc_library():
+        metrics.reset()
+        dc_library_scaper.scrape_dc_library_rss(kid_friendly=True)
+        return items_seen(dc_library_scaper.SOURCE_NAME)
+
+    # One unsharded feed, so every synthetic item is parsed once
+    def smithsonian():
+        metrics.reset()
+        smithsonian_scraper.scrape_smithsonian_rss(horizon_days=0)
+        return items_seen(smithsonian_scraper.SOURCE_NAME)
+
+    def smithsonian_parallel():
+        metrics.reset()
+        smithsonian_scraper.scrape_smithsonian_rss(parse_workers=os.cpu_count() or 2, horizon_days=0)
+        return items_seen(smithsonian_scraper.SOURCE_NAME)
+
+    def get_cost():
+        for description in descriptions:
+            smithsonian_scraper.get_cost(description)
+        return len(descriptions)
+
+    def kid_friendly():
+        for description in descriptions:
+            smithsonian_scraper.is_kid_friendly_event(description)
+        return len(descriptions)
+
+    def associates_price():
+        for url in associates_urls:
+            smithsonian_scraper.scrape_smithsonian_associates_price(url)
+        return len(associates_urls)
+
+    def website_price():
+        for url in website_urls:
+            smithsonian_scraper.scrape_website_for_price(url)
+        return len(website_urls)
+
+    return {
+        'scrape_dc_library_rss': dc_library,
+        'scrape_smithsonian_rss': smithsonian,
+        'scrape_smithsonian_rss_parallel': smithsonian_parallel,
+        'get_cost': get_cost,
+        'is_kid_friendly_event': kid_friendly,
+        'scrape_smithsonian_associates_price': associates_price,
+        'scrape_website_for_price': website_price,
+    }
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(entry['name'], entry['size']): entry for entry in json.load(f)}
+    regressions = 0
+    for entry in results:
+        before = baseline.get((entry['name'], entry['size']))
+        if not before or not before['items_per_second']:
+            continue
+        change = entry['items_per_second'] / before['items_per_second'] - 1
+        flag = ""
+        if change < -REGRESSION_THRESHOLD:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{entry['name']:<38} {entry['size']:>7} {change:+8.1%}{flag}")
+    return regressions
+
+def record(fixture_dir):
+    replay.install(http_client.get_session(), replay.RecordingAdapter(fixture_dir))
+    # Cold caches, so every response is fetched and saved; the rate limit stays on
+    with tempfile.TemporaryDirectory() as tmp:
+        http_cache._default_cache = http_cache.HttpCache(os.path.join(tmp, "http.sqlite"))
+        price_cache._default_price_cache = price_cache.PriceCache(os.path.join(tmp, "price.sqlite"))
+        dc_library_scaper.scrape_dc_library_rss(kid_friendly=True)
+        # Unsharded, as the benchmarks replay the one feed url
+        smithsonian_scraper.scrape_smithsonian_rss(horizon_days=0)
+        http_cache._default_cache.close()
+        price_cache._default_price_cache.close()
+    print(f"Fixtures saved to {fixture_dir}")
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Offline benchmarks for the scrapers")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                            help="synthetic feed sizes in items, e.g. 10000 100000")
+    arg_parser.add_argument("--fixtures", metavar="DIR", help="serve recorded responses from this directory first")
+    arg_parser.add_argument("--record", metavar="DIR", help="fetch live responses and save them as fixtures")
+    arg_parser.add_argument("--only", nargs="+", metavar="NAME", help="benchmarks to run")
+    arg_parser.add_argument("--no-memory", action="store_true", help="skip the traced peak memory runs")
+    arg_parser.add_argument("--save", metavar="PATH", help="write the results to this JSON file")
+    arg_parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --save")
+    arg_parser.add_argument("--verbose", action="store_true", help="keep the scrapers' logging and prints")
+    args = arg_parser.parse_args(argv)
+
+    if args.record:
+        record(args.record)
+        return 0
+
+    synthetic = replay.SyntheticResponses()
+    adapter = replay.FixtureAdapter(args.fixtures, fallback=synthetic)
+    replay.install(http_client.get_session(), adapter)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    results = []
+    print(f"{'benchmark':<38} {'size':>7} {'items':>8} {'seconds':>9} {'items/s':>10} {'peak MiB':>9}")
+    for size in args.sizes:
+        for name, func in benchmarks(size, synthetic, adapter).items():
+            if args.only and name not in args.only:
+                continue
+            with open(os.devnull, 'w') as devnull, contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    stack.enter_context(contextlib.redirect_stdout(devnull))
+                items, seconds, peak = measure(func, not args.no_memory)
+            fallback_urls = list(dict.fromkeys(adapter.take_fallback_urls()))
+            if fallback_urls:
+                print(f"warning: {name} used synthetic data for {len(fallback_urls)} urls not recorded in "
+                      f"{args.fixtures}, e.g. {fallback_urls[0]}", file=sys.stderr)
+            entry = {
+                'name': name,
+                'size': size,
+                'items': items,
+                'seconds': round(seconds, 4),
+                'items_per_second': round(items / seconds, 1) if seconds else None,
+                'peak_bytes': peak,
+            }
+            results.append(entry)
+            peak_mib = f"{peak / 2 ** 20:9.1f}" if peak is not None else f"{'-':>9}"
+            print(f"{name:<38} {size:>7} {items:>8} {seconds:>9.3f} {entry['items_per_second']:>10} {peak_mib}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        return 1 if compare(results, args.baseline) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Offline HTTP for the benchmarks: a requests transport adapter that serves
+recorded responses from disk, or synthetic libnet and Trumba feeds and
+ticketing pages when nothing was recorded for a url.
+
+A fixture directory holds the response bodies and a manifest.json mapping
+urls to files. A manifest key ending in '*' matches every url starting
+with the rest of it, the longest match winning:
+
+    {
+      "https://www.trumba.com/calendars/smithsonian-events.rss*": "trumba.rss",
+      "https://dclibrary.libnet.info/feeds*": "libnet.rss",
+      "https://smithsonianassociates.org/ticketing/tickets/123": "associates_123.html"
+    }
+
+RecordingAdapter writes that layout from live responses.
+"""
+import hashlib
+import io
+import json
+import os
+import random
+from datetime import date, timedelta
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MANIFEST = "manifest.json"
+
+# Distinct ticketing and event pages the synthetic feeds link to
+PRICE_PAGES = 500
+
+CONTENT_TYPES = {
+    '.rss': 'application/rss+xml; charset=utf-8',
+    '.xml': 'application/xml; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+}
+
+LIBRARIES = [
+    "Petworth Neighborhood Library", "Georgetown Neighborhood Library",
+    "Martin Luther King Jr. Memorial Library - Central Library", "Virtual",
+]
+MUSEUMS = [
+    "National Museum of Natural History", "National Air and Space Museum",
+    "Hirshhorn Museum", "National Portrait Gallery",
+]
+TOPICS = ["Knitting Circle", "Watercolor Basics", "Family Art Lab", "Zine Workshop",
+          "Pottery Wheel", "Lego Builders", "Printmaking Studio", "Calligraphy"]
+AUDIENCES = ["Ages 8 - 12", "Adults", "All ages", "Ages 18+", "Teens"]
+FILLER = ("Join our instructor for a hands-on session exploring techniques from the "
+          "collection, with all materials provided and time to take your work home. ")
+
+def _future(days):
+    return date.today() + timedelta(days=days)
+
+def libnet_feed(items, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(items):
+        # About one in ten events is already over
+        event_date = _future(rng.randint(-30, -1) if rng.random() < 0.1 else rng.randint(1, 365))
+        hour = rng.randint(1, 11)
+        title = f"{rng.choice(TOPICS)} {i}"
+        library = rng.choice(LIBRARIES)
+        age = rng.choice(["5 - 12 Years Old", "13 - 19 Years Old (Teens)", "Adults"])
+        description = f"{event_date.strftime('%A, %B %d, %Y')} at {hour}:00 PM {library} {age}"
+        encoded = f"<p>{FILLER * 3}</p><p>{library}</p><p>{age}</p>"
+        entries.append(
+            "<item>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://dclibrary.libnet.info/event/{seed}-{i}</link>"
+            f"<guid>https://dclibrary.libnet.info/event/{seed}-{i}</guid>"
+            f"<description>{escape(description)}</description>"
+            f"<content:encoded>{escape(encoded)}</content:encoded>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+        "<channel><title>DC Public Library Events</title>"
+        + "".join(entries) +
+        "</channel></rss>"
+    ).encode('utf-8')
+
+def trumba_description(i, rng):
+    event_date = _future(rng.randint(1, 365))
+    hour = rng.randint(1, 8)
+    venue = rng.choice(MUSEUMS)
+    pricing = i % 3
+    if pricing == 0:
+        cost = f"<br/><b>Cost</b>:&nbsp;${rng.randint(10, 60)}"
+        link = ""
+    elif pricing == 1:
+        cost = ""
+        link = (f'<br/><a href="https://smithsonianassociates.org/ticketing/tickets/{i % PRICE_PAGES}">'
+                "Click here to view prices</a>")
+    else:
+        cost = ""
+        link = ""
+    return (
+        f"{event_date.strftime('%A, %B %d, %Y')}, {hour} &ndash; {hour + 1}:30pm"
+        f"<br/><br/>{FILLER * 2}{link}<br/><br/>"
+        f"<b>Venue</b>:&nbsp;{venue}, 10th St. &amp; Constitution Ave. NW"
+        f"{cost}"
+        f"<br/><b>Recommended Audience</b>:&nbsp;{rng.choice(AUDIENCES)}<br/>"
+    ), event_date
+
+def trumba_feed(items, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(items):
+        description, event_date = trumba_description(i, rng)
+        title = f"{rng.choice(TOPICS)} {i}"
+        if rng.random() < 0.02:
+            title = "CANCELLED: " + title
+        entries.append(
+            "<item>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://www.si.example/events/{i % PRICE_PAGES}</link>"
+            f"<guid>https://www.trumba.com/event/{seed}-{i}</guid>"
+            f"<category>{event_date.strftime('%Y/%m/%d')} ({event_date.strftime('%a')})</category>"
+            f"<description>{escape(description)}</description>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0">'
+        "<channel><title>Smithsonian Events</title>"
+        + "".join(entries) +
+        "</channel></rss>"
+    ).encode('utf-8')
+
+def associates_page(page):
+    return (
+        f"<html><body><h1>Program {page}</h1><p>{FILLER * 20}</p>"
+        f"<p>Tickets</p><p>Members ${20 + page % 30} Gen. Admission ${30 + page % 30}</p>"
+        f"<p>{FILLER * 20}</p></body></html>"
+    ).encode('utf-8')
+
+def website_page(page):
+    return (
+        f"<html><body><h1>Event {page}</h1><p>{FILLER * 20}</p>"
+        f"<p>Ticket price ${15 + page % 40} per person</p></body></html>"
+    ).encode('utf-8')
+
+"""
+Serves synthetic bodies by host. Feeds are built once per size and reused
+"""
+class SyntheticResponses:
+    def __init__(self, libnet_items=100, trumba_items=1000):
+        self.libnet_items = libnet_items
+        self.trumba_items = trumba_items
+        self._bodies = {}
+
+    def _memo(self, key, build):
+        if key not in self._bodies:
+            self._bodies[key] = build()
+        return self._bodies[key]
+
+    def __call__(self, url):
+        parsed = urlparse(url)
+        tail = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+        page = int(tail) if tail.isdigit() else 0
+        if parsed.netloc == 'dclibrary.libnet.info':
+            return self._memo(('libnet', self.libnet_items), lambda: libnet_feed(self.libnet_items)), '.rss'
+        if parsed.netloc == 'www.trumba.com':
+            return self._memo(('trumba', self.trumba_items), lambda: trumba_feed(self.trumba_items)), '.rss'
+        if parsed.netloc == 'smithsonianassociates.org':
+            return self._memo(('associates', page), lambda: associates_page(page)), '.html'
+        return self._memo(('website', page), lambda: website_page(page)), '.html'
+
+"""
+Transport adapter answering every request from a fixture directory, then
+from fallback (a callable returning (body, extension) or None) if given.
+With a fixture directory, the urls served by fallback are kept in
+fallback_urls, so a benchmark that missed its recordings can say so
+"""
+class FixtureAdapter(BaseAdapter):
+    def __init__(self, fixture_dir=None, fallback=None):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        self.fallback = fallback
+        self.fallback_urls = []
+        self.manifest = {}
+        if fixture_dir and os.path.exists(os.path.join(fixture_dir, MANIFEST)):
+            with open(os.path.join(fixture_dir, MANIFEST), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        self._prefixes = sorted((key[:-1] for key in self.manifest if key.endswith('*')), key=len, reverse=True)
+
+    def _recorded(self, url):
+        filename = self.manifest.get(url)
+        if filename is None:
+            prefix = next((prefix for prefix in self._prefixes if url.startswith(prefix)), None)
+            filename = self.manifest.get(prefix + '*') if prefix is not None else None
+        if filename is None:
+            return None
+        with open(os.path.join(self.fixture_dir, filename), 'rb') as f:
+            return f.read(), os.path.splitext(filename)[1]
+
+    """
+    Returns the urls recorded exactly, i.e. not by a prefix, in manifest order
+    """
+    def recorded_urls(self):
+        return [url for url in self.manifest if not url.endswith('*')]
+
+    """
+    Returns the urls served by fallback since the last call
+    """
+    def take_fallback_urls(self):
+        urls, self.fallback_urls = self.fallback_urls, []
+        return urls
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        found = self._recorded(request.url)
+        if found is None and self.fallback:
+            found = self.fallback(request.url)
+            if found is not None and self.fixture_dir:
+                self.fallback_urls.append(request.url)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.reason = 'OK' if found else 'Not Found'
+        response.status_code = 200 if found else 404
+        body, extension = found or (b"", ".html")
+        response.headers = CaseInsensitiveDict({
+            'Content-Type': CONTENT_TYPES.get(extension, 'application/octet-stream'),
+            'Content-Length': str(len(body)),
+        })
+        response.raw = io.BytesIO(body)
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
+
+"""
+Adapter fetching live responses and saving them as fixtures for FixtureAdapter
+"""
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, fixture_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+        path = os.path.join(fixture_dir, MANIFEST)
+        self.manifest = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            content_type = response.headers.get('Content-Type', '')
+            extension = '.html' if 'html' in content_type else '.rss' if 'rss' in content_type else '.xml'
+            filename = hashlib.sha1(request.url.encode('utf-8')).hexdigest()[:16] + extension
+            with open(os.path.join(self.fixture_dir, filename), 'wb') as f:
+                f.write(response.content)
+            self.manifest[request.url] = filename
+            with open(os.path.join(self.fixture_dir, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, indent=2)
+        return response
+
+"""
+Routes every request made through the shared session to adapter
+"""
+def install(session, adapter):
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
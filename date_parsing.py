@@ -0,0 +1,136 @@
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+
+_month_names = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+# One pass finds every date token. Kinds are ranked the way the old
+# strptime cascade tried them: month names, then m/d/y, then m-d-y, then ISO
+_date_token = re.compile(
+    r'\b(?:'
+    r'(?P<iy>\d{4})-(?P<im>\d{1,2})-(?P<id>\d{1,2})'
+    rf'|(?P<month>{_month_names})\s+(?P<nd>\d{{1,2}}),?\s+(?P<ny>\d{{4}})'
+    r'|(?P<sm>\d{1,2})/(?P<sd>\d{1,2})/(?P<sy>\d{4}|\d{2})'
+    r'|(?P<dm>\d{1,2})-(?P<dd>\d{1,2})-(?P<dy>\d{4}|\d{2})'
+    r')\b',
+    re.I
+)
+_month_day_year = re.compile(
+    r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{1,2}),\s+(\d{4})"
+)
+_clock_time = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b', re.I)
+_time_range = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*[–-]\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)",
+    re.I
+)
+
+MEMO_SIZE = 4096
+
+def _year(value):
+    year = int(value)
+    if len(value) == 2:
+        year += 2000 if year < 69 else 1900
+    # Matches the old strptime handling of years before 1970
+    return year + 100 if year < 1970 else year
+
+def _date_candidate(match):
+    if match.group('month'):
+        return 0, MONTHS[match.group('month').lower()], match.group('nd'), match.group('ny')
+    if match.group('sm'):
+        return 1, match.group('sm'), match.group('sd'), match.group('sy')
+    if match.group('dm'):
+        return 2, match.group('dm'), match.group('dd'), match.group('dy')
+    return 3, match.group('im'), match.group('id'), match.group('iy')
+
+"""
+Finds the first valid date in text, month names first, then m/d/y, m-d-y and ISO dates
+Returns a date or None
+"""
+@lru_cache(maxsize=MEMO_SIZE)
+def find_date(text):
+    candidates = sorted(
+        (_date_candidate(match) + (match.start(),) for match in _date_token.finditer(text)),
+        key=lambda candidate: (candidate[0], candidate[4])
+    )
+    for _, month, day, year, _ in candidates:
+        try:
+            return date(_year(year), int(month), int(day))
+        except ValueError:
+            continue
+    return None
+
+"""
+Finds a 'Month D, YYYY' date, as written on the first line of Smithsonian descriptions
+Returns a date or None
+"""
+@lru_cache(maxsize=MEMO_SIZE)
+def find_month_day_year(text):
+    match = _month_day_year.search(text)
+    if not match:
+        return None
+    month, day, year = match.groups()
+    try:
+        return date(int(year), MONTHS[month.lower()], int(day))
+    except ValueError:
+        return None
+
+"""
+Builds a time from 12-hour clock parts
+Returns a time or None if the parts are out of range
+"""
+def clock_time(hour, minute, meridiem):
+    hour = int(hour)
+    minute = int(minute) if minute else 0
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if meridiem.lower() == 'pm':
+        hour = hour % 12 + 12
+    else:
+        hour = hour % 12
+    return time(hour, minute)
+
+"""
+Finds the first am/pm clock time in text, preferring one written with minutes
+Returns a time or None
+"""
+@lru_cache(maxsize=MEMO_SIZE)
+def find_time(text):
+    first = None
+    for match in _clock_time.finditer(text):
+        if match.group(2):
+            first = match
+            break
+        if first is None:
+            first = match
+    if first is None:
+        return None
+    return clock_time(*first.groups())
+
+"""
+Finds a start - end time range such as '10 - 11:30am'. A start without
+am/pm takes the end's
+Returns a tuple of start and end times, (None, None) if there is no valid range
+"""
+@lru_cache(maxsize=MEMO_SIZE)
+def find_time_range(text):
+    match = _time_range.search(text)
+    if not match:
+        return None, None
+    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+    start = clock_time(start_hour, start_minute, start_meridiem or end_meridiem)
+    end = clock_time(end_hour, end_minute, end_meridiem)
+    if start is None or end is None:
+        return None, None
+    return start, end
+
+"""
+Returns the midnight datetime for a date, for callers that compare against datetime.today()
+"""
+def as_datetime(value):
+    return datetime(value.year, value.month, value.day)
@@ -1,17 +1,32 @@
 import requests
+from http_cache import cached_get, cached_stream
+from rss_stream import iter_rss_items, soup_item_fields
+from http_client import log_timing_summary
+from date_parsing import find_date, find_time
+from item_filters import run_filters, title_filter, date_window_filter, seen_filter
+from workshop import Workshop
+from seen_index import SeenIndex, DEFAULT_SEEN_INDEX_PATH
+from workshop_sink import WorkshopSink, FORMATS, output_filename
+from workshop_store import WorkshopStore
+from sources import Source, register_source
+from metrics import metrics
+from deadline import DeadlineExceeded, as_deadline
+from log_config import ItemLogger, add_verbosity_arguments, configure_logging
 from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 import json
-import time
 import base64
-import traceback
 import logging
+import argparse
+import xml.etree.ElementTree as ET
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
-logging.basicConfig(level=logging.NOTSET)
-logging.getLogger('chardet.charsetprober').setLevel(logging.INFO)
-logging.getLogger("bs4.dammit").setLevel(logging.ERROR)
 log = logging.getLogger("dc_library_scraper")
+item_log = ItemLogger(log)
 
 library_location_codes = {
     "Anacostia Neighborhood Library": "2305",
@@ -43,16 +58,62 @@ library_location_codes = {
     "Woodridge Neighborhood Library": "2329",
 }
 
-def encode_rss_filter(location_id, kids=False, types=None, term="", days=1):
-    if kids:
-        ages = ["Birth - 5", "5 - 12 Years Old", "13 - 19 Years Old (Teens)"]
-    else:
-        ages = ["Adults", "Seniors"]
+KID_AGES = ["Birth - 5", "5 - 12 Years Old", "13 - 19 Years Old (Teens)"]
+ADULT_AGES = ["Adults", "Seniors"]
+
+# Locations per combined feed request in scrape_dc_library_rss_batched
+BATCH_SIZE = 9
+# libnet pages its feeds, a combined feed this long is treated as truncated
+BATCH_FEED_ITEM_LIMIT = 100
+# Item fields a combined feed item can name its library and age group in. An
+# item is only attributed on an exact match of one of these, never by
+# searching its text, which mis-attributed events mentioning another branch
+LOCATION_FIELDS = ("location", "ev:location", "category")
+AUDIENCE_FIELDS = ("ages", "audience", "category")
+
+SOURCE_NAME = "dc_library"
+FEED_URL = "https://dclibrary.libnet.info/feeds?data="
+RSS_HEADERS = {
+    'Accept': 'application/rss+xml, application/xml, text/xml, */*',
+    'Cache-Control': 'no-cache'
+}
+
+# Bounds for the concurrent per-location fetch in scrape_dc_library_rss.
+# Requests time out after REQUEST_TIMEOUT, or sooner when less of the
+# deadline is left
+MAX_FETCH_WORKERS = 8
+MAX_REQUESTS_PER_HOST = 4
+FETCH_DEADLINE = 120
+REQUEST_TIMEOUT = 30
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+# Holds one of the slots capping concurrent requests to the url's host,
+# raising DeadlineExceeded if none frees up before the deadline
+@contextmanager
+def _host_slot(url, deadline=None):
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        semaphore = _host_semaphores[host]
+    if not semaphore.acquire(timeout=deadline.remaining() if deadline else None):
+        raise DeadlineExceeded(f"No request slot for {host} before the deadline")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+def encode_rss_filter(location_id, kids=False, types=None, term="", days=1, ages=None):
+    if ages is None:
+        ages = KID_AGES if kids else ADULT_AGES
+    location_ids = list(location_id) if isinstance(location_id, (list, tuple)) else [location_id]
     
     filter_data = {
         "feedType": "rss",
         "filters": {
-            "location": [location_id],
+            "location": location_ids,
             "ages": ages,
             "types": ["Arts & Crafts", "Makers & DIY Program", "Writing"],
             "tags": [],
@@ -72,73 +133,10 @@ def parse_date(date_text):
     
     date_text = re.sub(r'<[^>]+>', '', str(date_text))
     date_text = re.sub(r'\s+', ' ', date_text).strip()
-    
-    date_patterns = [
-        r'(\w+\s+\d{1,2},?\s+\d{4})',
-        r'(\d{1,2}/\d{1,2}/\d{2,4})',
-        r'(\d{1,2}-\d{1,2}-\d{2,4})',
-        r'(\d{4}-\d{1,2}-\d{1,2})'
-    ]
-    
-    for pattern in date_patterns:
-        matches = re.findall(pattern, date_text, re.IGNORECASE)
-        for match in matches:
-            date_str = match.strip()
-            
-            formats = [
-                '%B %d, %Y',
-                '%b %d, %Y',
-                '%B %d %Y',
-                '%b %d %Y',
-                '%m/%d/%Y',
-                '%m/%d/%y',
-                '%m-%d-%Y',
-                '%m-%d-%y',
-                '%Y-%m-%d',
-                '%d.%m.%Y',
-                '%d.%m.%y',
-            ]
-            
-            for fmt in formats:
-                try:
-                    parsed_date = datetime.strptime(date_str, fmt)
-                    if parsed_date.year < 1970:
-                        parsed_date = parsed_date.replace(year=parsed_date.year + 100)
-                    return parsed_date.date() if parsed_date else ""
-                except ValueError:
-                    continue
-    
-    return None
+    return find_date(date_text)
 
 def parse_time(text):
-    time_patterns = [
-        r'(\d{1,2}:\d{2}\s*(?:am|pm|AM|PM))',
-        r'(\d{1,2}\s*(?:am|pm|AM|PM))',
-        r'(\d{1,2}:\d{2})',
-        r'at\s+(\d{1,2}:\d{2}\s*(?:am|pm|AM|PM))',
-        r'at\s+(\d{1,2}\s*(?:am|pm|AM|PM))',
-    ]
-    time_part = ""
-    for pattern in time_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            time_part = match.group(1).strip()
-            break
-    time_formats = [
-        "%I:%M %p",
-        "%I:%M%p",
-        "%I %p",
-        "%I%p"
-    ]
-    
-    start_time = None
-    for fmt in time_formats:
-        try:
-            start_time = datetime.strptime(time_part, fmt)
-            return start_time.time()
-        except ValueError:
-            continue
-    return None
+    return find_time(text)
 
 def extract_datetime_from_text(text):
     if not text:
@@ -157,147 +155,422 @@ def extract_datetime_from_text(text):
     else:
         return (None, None)
 
-def scrape_dc_library_rss(kid_friendly = False, title_set = None):
-    scraped_at = datetime.now().isoformat()
+# Parses a fully downloaded feed with the lenient XML parser, for feeds the streaming parser rejects
+def parse_feed_body(content, location=None):
+    with metrics.stage("xml_parse", SOURCE_NAME, location):
+        soup = BeautifulSoup(content, 'xml')
+        items = [soup_item_fields(item) for item in soup.find_all('item')]
+        next_link = soup.find('link', attrs={'rel': 'next'})
+    channel = {'next': next_link.get('href', "")} if next_link else {}
+    return channel, items
+
+# Each request's timeout is the time left before deadline, at most
+# REQUEST_TIMEOUT, and a streamed body is abandoned once it expires
+def _fetch_feed(rss_url, location=None, deadline=None):
+    deadline = as_deadline(deadline)
+    log.info("Fetching RSS feed: %s", rss_url)
+
+    channel = {}
+    try:
+        with _host_slot(rss_url, deadline), metrics.stage("xml_parse", SOURCE_NAME, location):
+            body = cached_stream(rss_url, headers=RSS_HEADERS, timeout=deadline.timeout(REQUEST_TIMEOUT))
+            chunks = metrics.download(deadline.guard(body), SOURCE_NAME, location)
+            items = list(iter_rss_items(chunks, channel))
+    except ET.ParseError as e:
+        log.warning("Streaming RSS parse failed, parsing the full feed instead: %s", e)
+        with _host_slot(rss_url, deadline), metrics.stage("fetch", SOURCE_NAME, location):
+            response = cached_get(rss_url, headers=RSS_HEADERS, timeout=deadline.timeout(REQUEST_TIMEOUT))
+        response.raise_for_status()
+        metrics.count_response(response, SOURCE_NAME, location)
+        channel, items = parse_feed_body(response.content, location)
+
+    log.info("RSS feed fetched successfully: Found %s items", len(items))
+    return channel, items
+
+# Date of an item read straight from its title and description, for the date window filter
+def _raw_item_date(item):
+    return parse_date(f"{item.get('title', '').strip()} {item.get('description', '').strip()}")
+
+# Cheap checks run on each raw item before it is parsed. The seen index goes
+# first: an adult item dropped as a duplicate of a kid title still has to be
+# marked, or the next incremental run, which skips the unchanged kid item and
+# so never learns its title, would emit the adult copy as new
+def item_filters(title_set=None, seen_index=None, current_date=None, horizon_days=None):
+    today = (current_date or datetime.now()).date()
+    end = today + timedelta(days=horizon_days) if horizon_days else None
+    filters = [title_filter(title_set), date_window_filter(_raw_item_date, today, end)]
+    if seen_index is not None:
+        filters.insert(0, seen_filter(seen_index, SOURCE_NAME))
+    return filters
+
+def _parse_item(item, location, kid_friendly, title_set, scraped_at, rss_url, current_date, seen_index=None, filters=None):
+    metrics.count("items_seen", SOURCE_NAME, location)
+    if filters is None:
+        filters = item_filters(title_set, seen_index, current_date)
+    reason = run_filters(filters, item)
+    if reason:
+        item_log.debug("Skipping: %s, %s", item.get('title', ''), reason)
+        metrics.count("items_skipped", SOURCE_NAME, location, reason)
+        return None
+
+    clean_description = item.get('content:encoded', "")
+    title = item.get('title', "").strip()
+    description = item.get('description', "").strip()
+    link = item.get('link', "")
+
+    full_text = f"{title} {description}"
+    with metrics.stage("date_extraction", SOURCE_NAME, location):
+        date_time = extract_datetime_from_text(full_text)
+    event_date = date_time[0] if date_time else None
+
+    if event_date:
+        if event_date < current_date.date():
+            item_log.debug("Skipping past event title: %s, %s", title, event_date)
+            metrics.count("items_skipped", SOURCE_NAME, location, "past")
+            return None
+    else:
+        item_log.debug("Skipping event %s without date", title)
+        metrics.count("items_skipped", SOURCE_NAME, location, "no_date")
+        return None
+
+    workshop_data = Workshop(
+        url=link.strip() if link else rss_url,
+        scraped_at=scraped_at,
+        title=title,
+        description=clean_description.strip() if clean_description else title,
+        date=event_date.strftime("%Y-%m-%d"),
+        time=date_time[1].strftime("%H:%M:%S") if date_time[1] else None,
+        price=0.0,
+        location=location,
+        kidfriendly=kid_friendly,
+        submittedBy="scraper_dc_library",
+        business='DC Libaries',
+        source=SOURCE_NAME,
+    )
+    item_log.debug("Successfully extracted event: %s", title)
+    return workshop_data
+
+def location_feed_url(location, kid_friendly):
+    return FEED_URL + encode_rss_filter(library_location_codes[location], kid_friendly)
+
+# Parses one location's feed items, dropping the ones that are skipped or fail
+def parse_location_items(items, location, kid_friendly, title_set, scraped_at, rss_url, seen_index=None, horizon_days=None):
     workshops = []
+    current_date = datetime.now()
+    if len(items) <= 1:
+        return workshops
 
-    for location in library_location_codes.keys():
-        rss_url = "https://dclibrary.libnet.info/feeds?data="+encode_rss_filter(library_location_codes[location], kid_friendly)
+    filters = item_filters(title_set, seen_index, current_date, horizon_days)
+    for item in items:
         try:
-            log.info(f"Fetching RSS feed: {rss_url}")
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/rss+xml, application/xml, text/xml, */*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Cache-Control': 'no-cache'
-            }
-            response = requests.get(rss_url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            current_date = datetime.now()
-
-            log.info("RSS feed fetched successfully")
-            
-            items = []
-            
-            try:
-                soup = BeautifulSoup(response.content, 'xml')
-                log.info("BeautifulSoup XML: Found {} items".format(len(items)))
-            except Exception as e:
-                log.warning(f"BeautifulSoup XML failed: {e}")
-            
-            items = soup.find_all('item')
-            if len(items) <= 1:
+            workshop_data = _parse_item(item, location, kid_friendly, title_set, scraped_at, rss_url, current_date, seen_index, filters)
+            if workshop_data:
+                workshops.append(workshop_data)
+        except Exception as e:
+            log.error("%s", e)
+            metrics.count("items_skipped", SOURCE_NAME, location, "error")
+            if seen_index is not None:
+                seen_index.discard(SOURCE_NAME, item)
+            continue
+    return workshops
+
+# Fetches one location's feed for one audience
+# Returns (rss_url, items), or None if the feed could not be read
+def _fetch_location(location, kid_friendly, deadline=None):
+    rss_url = location_feed_url(location, kid_friendly)
+    try:
+        channel, items = _fetch_feed(rss_url, location, deadline)
+    except DeadlineExceeded as e:
+        log.warning("%s, dropping location: %s", e, location)
+        return None
+    except requests.exceptions.RequestException as e:
+        log.error("Network error fetching RSS feed: %s", rss_url)
+        log.debug("%s", e)
+        return None
+    except Exception:
+        log.error("Error parsing RSS feed: %s", rss_url)
+        log.debug("Full traceback:", exc_info=True)
+        return None
+    return rss_url, items
+
+# Feeds are fetched concurrently and parsed on the calling thread once all
+# are in or deadline expires, so only feeds that are kept touch seen_index.
+# deadline is in seconds or a Deadline shared with the caller. Requests in
+# flight when it expires time out with it, so no worker outlives it
+def scrape_dc_library_rss(kid_friendly = False, title_set = None, max_workers = MAX_FETCH_WORKERS, deadline = FETCH_DEADLINE, locations = None, scraped_at = None, seen_index = None, horizon_days = None):
+    scraped_at = scraped_at or datetime.now().isoformat()
+    locations = list(locations) if locations is not None else list(library_location_codes.keys())
+    deadline = as_deadline(deadline)
+    feeds = {}
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = {
+        executor.submit(_fetch_location, location, kid_friendly, deadline): location
+        for location in locations
+    }
+    done, not_done = wait(futures, timeout=deadline.remaining())
+    for future in done:
+        location = futures[future]
+        try:
+            feeds[location] = future.result()
+        except Exception as e:
+            log.error("Error scraping location %s: %s", location, e)
+    for future in not_done:
+        log.warning("Deadline of %ss reached, dropping location: %s", deadline.seconds, futures[future])
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    # Merge in library_location_codes order so the output is stable between runs
+    results = parse_locations(feeds, locations, kid_friendly, title_set, scraped_at, seen_index, horizon_days)
+    workshops = []
+    for location in locations:
+        workshops.extend(results.get(location, []))
+    return workshops
+
+# Parses the fetched feeds of one audience, shared by the threaded and async
+# engines. feeds maps location to (rss_url, items), or None when it failed
+# Returns {location: [Workshop]}
+def parse_locations(feeds, locations, kid_friendly, title_set, scraped_at, seen_index = None, horizon_days = None):
+    results = {}
+    for location in locations:
+        if not feeds.get(location):
+            continue
+        rss_url, items = feeds[location]
+        try:
+            results[location] = parse_location_items(items, location, kid_friendly, title_set, scraped_at, rss_url, seen_index, horizon_days)
+        except Exception:
+            log.error("Error parsing RSS feed: %s", rss_url)
+            log.debug("Full traceback:", exc_info=True)
+    return results
+
+# Attributes a combined feed item to the batch location its location field names
+def _attribute_location(item, locations):
+    names = {location.lower(): location for location in locations}
+    for field in LOCATION_FIELDS:
+        value = item.get(field, "").strip().lower()
+        if value in names:
+            return names[value]
+    return None
+
+# Attributes a combined feed item to the kid (True) or adult (False) audience its age field names
+def _attribute_audience(item):
+    for field in AUDIENCE_FIELDS:
+        value = item.get(field, "").strip().lower()
+        if value in (age.lower() for age in KID_AGES):
+            return True
+        if value in (age.lower() for age in ADULT_AGES):
+            return False
+    return None
+
+# Fetches one combined feed for a batch of locations and both audiences.
+# Returns {(location, kid_friendly): [items]}, or None when the batch has to
+# fall back to per-location requests
+def _fetch_batch(locations, deadline=None):
+    location_ids = [library_location_codes[location] for location in locations]
+    rss_url = FEED_URL + encode_rss_filter(location_ids, ages=KID_AGES + ADULT_AGES)
+    try:
+        channel, items = _fetch_feed(rss_url, deadline=deadline)
+    except DeadlineExceeded as e:
+        log.warning("%s, dropping batch: %s", e, locations)
+        return {}
+    except requests.exceptions.RequestException as e:
+        log.error("Network error fetching combined RSS feed: %s", rss_url)
+        log.debug("%s", e)
+        return None
+
+    if channel.get('next') or len(items) >= BATCH_FEED_ITEM_LIMIT:
+        log.warning("Combined feed truncated at %s items, falling back for: %s", len(items), locations)
+        return None
+
+    grouped = {}
+    if len(items) <= 1:
+        return grouped
+
+    for item in items:
+        location = _attribute_location(item, locations)
+        kid_friendly = _attribute_audience(item)
+        if location is None or kid_friendly is None:
+            log.warning("Could not attribute combined feed item, falling back for: %s", locations)
+            return None
+        grouped.setdefault((location, kid_friendly), []).append((item, rss_url))
+    return grouped
+
+# Writes one audience's workshops in locations order, returning their titles.
+# A workshop that does not fit the schema is logged and skipped, so one bad
+# record does not stop the rest
+def emit_locations(results, locations, emit):
+    titles = set()
+    for location in locations:
+        for workshop in results.get(location, []):
+            problems = workshop.validate()
+            if problems:
+                log.warning("Dropping invalid workshop from %s, %s: %s", location, workshop.title, ", ".join(problems))
+                metrics.count("items_skipped", SOURCE_NAME, location, "invalid")
                 continue
+            titles.add(workshop.title)
+            with metrics.stage("output", SOURCE_NAME, location):
+                emit(workshop)
+            metrics.count("items_emitted", SOURCE_NAME, location)
+    return titles
 
-            for item in items:
-                content_encoded = item.find('content:encoded')
-                if content_encoded:
-                    html_content = content_encoded.get_text()
-                if html_content:
-                    clean_description = html_content
-                
+# Scrapes both audiences with one feed request per location and audience.
+# Kid events come first, then adult events not already listed for kids.
+# With a sink, workshops are written to it instead of being collected, and
+# the returned list is empty
+def scrape_dc_library(max_workers = MAX_FETCH_WORKERS, deadline = FETCH_DEADLINE, seen_index = None, sink = None, locations = None, horizon_days = None):
+    scraped_at = datetime.now().isoformat()
+    locations = [location for location in library_location_codes if locations is None or location in locations]
+    deadline = as_deadline(deadline)
+
+    workshops = []
+    emit = sink.write if sink is not None else workshops.append
+    title_set = None
+    for kid_friendly in (True, False):
+        results = {}
+        for workshop in scrape_dc_library_rss(kid_friendly, title_set, max_workers, deadline, locations, scraped_at, seen_index, horizon_days):
+            results.setdefault(workshop.location, []).append(workshop)
+        audience_titles = emit_locations(results, locations, emit)
+        if kid_friendly:
+            title_set = audience_titles
+    return workshops
+
+# Like scrape_dc_library, but requests one combined feed per batch of
+# locations for both audiences. Items are attributed back from their
+# LOCATION_FIELDS and AUDIENCE_FIELDS, and a batch with any item that cannot
+# be falls back to per-location requests. This is opt-in: whether libnet
+# feeds carry those fields has to be checked on recorded real feeds
+# (benchmarks/bench_scrapers.py --record) before it becomes the default
+def scrape_dc_library_rss_batched(batch_size = BATCH_SIZE, max_workers = MAX_FETCH_WORKERS, deadline = FETCH_DEADLINE, seen_index = None, sink = None, locations = None, horizon_days = None):
+    scraped_at = datetime.now().isoformat()
+    # Unwanted locations are never requested, the cheapest filter of all
+    locations = [location for location in library_location_codes if locations is None or location in locations]
+    batches = [locations[i:i + batch_size] for i in range(0, len(locations), batch_size)]
+    deadline = as_deadline(deadline)
+
+    grouped = {}
+    fallback_locations = []
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = {executor.submit(_fetch_batch, batch, deadline): tuple(batch) for batch in batches}
+    done, not_done = wait(futures, timeout=deadline.remaining())
+    for future in done:
+        batch = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            log.error("Error scraping batch %s: %s", batch, e)
+            result = None
+        if result is None:
+            fallback_locations.extend(batch)
+        else:
+            grouped.update(result)
+    for future in not_done:
+        log.warning("Deadline of %ss reached, dropping batch: %s", deadline.seconds, futures[future])
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    current_date = datetime.now()
+    fallback_locations = [location for location in locations if location in fallback_locations]
+    batched_locations = [location for location in locations if location not in fallback_locations]
+
+    # Kid events first, then adult events not already listed for kids, as main() always has
+    workshops = []
+    emit = sink.write if sink is not None else workshops.append
+    title_set = None
+    for kid_friendly in (True, False):
+        results = {}
+        filters = item_filters(title_set, seen_index, current_date, horizon_days)
+        for location in batched_locations:
+            results[location] = []
+            for item, rss_url in grouped.get((location, kid_friendly), []):
                 try:
-                    title = ""
-                    link = ""
-                    pub_date = ""
-                    description = ""
-
-                    if hasattr(item, 'find'):
-                        title_elem = item.find('title')
-                        desc_elem = item.find('description')
-                        link_elem = item.find('link')
-                        date_elem = item.find('pubDate') or item.find('pubdate')
-                        desc_elem = item.find('description')
-
-                        title = title_elem.get_text().strip() if title_elem else ""
-                        description = desc_elem.get_text().strip() if desc_elem else ""
-                        link = link_elem.get_text() if link_elem else ""
-                        pub_date = date_elem.get_text() if date_elem else ""
-                    else:
-                        title_elem = item.find('title')
-                        desc_elem = item.find('description') 
-                        link_elem = item.find('link')
-                        date_elem = item.find('pubDate')
-                        
-                        title = title_elem.text.strip() if title_elem is not None else ""
-                        description = desc_elem.text.strip() if desc_elem is not None else ""
-                        link = link_elem.text if link_elem is not None else ""
-                        pub_date = date_elem.text if date_elem is not None else ""
-                    
-                    if not title or len(title.strip()) < 3 :
-                        log.warning(f"Skipping: {title}, No meaningful title")
-                        continue
-                    if title_set is not None and title in title_set:
-                        log.info(f"Skipping: {title}, Already added")
-                        continue
-
-                    full_text = f"{title} {description}"
-                    date_time = extract_datetime_from_text(full_text)
-                    event_date = date_time[0] if date_time else None
-
-                    if event_date:
-                        if event_date < current_date.date():
-                            log.warning(f"Skipping past event title: {title}, {event_date}")
-                            continue
-                    else:
-                        log.warning(f"Skipping event {title} without date")
-                        continue
-                    
-                    workshop_data = {
-                        'url': link.strip() if link else rss_url,
-                        'scraped_at': scraped_at,
-                        'title': title,
-                        'description': clean_description.strip() if clean_description else title,
-                        'date': event_date.strftime("%Y-%m-%d"), 
-                        'time': date_time[1].strftime("%H:%M:%S") if date_time[1] else None,
-                        'price': 0,
-                        'location': location,
-                        'kidfriendly': kid_friendly,
-                        'submittedBy': "scraper_dc_library",
-                        'business': 'DC Libaries'
-                    }
-                    log.info(f"Successfully extracted event: {title}")
-                    workshops.append(workshop_data)
-                    
+                    workshop_data = _parse_item(item, location, kid_friendly, title_set, scraped_at, rss_url, current_date, seen_index, filters)
+                    if workshop_data:
+                        results[location].append(workshop_data)
                 except Exception as e:
-                    log.error(f"{e}")
-                    continue
-            
-        except requests.exceptions.RequestException as e:
-            log.error(f"Network error fetching RSS feed: {rss_url}")
-            log.debug(f"{e}")
-        except Exception as e:
-            log.error(f"Error parsing RSS feed: {rss_url}")
-            log.debug("Full traceback:", exc_info=True)
-        
+                    log.error("%s", e)
+                    metrics.count("items_skipped", SOURCE_NAME, location, "error")
+                    if seen_index is not None:
+                        seen_index.discard(SOURCE_NAME, item)
+        if fallback_locations:
+            fallback = scrape_dc_library_rss(kid_friendly, title_set, max_workers, deadline, fallback_locations, scraped_at, seen_index, horizon_days)
+            for workshop in fallback:
+                results.setdefault(workshop.location, []).append(workshop)
+
+        audience_titles = emit_locations(results, locations, emit)
+        if kid_friendly:
+            title_set = audience_titles
+
     return workshops
 
-def main():
+# The libnet feeds as a source for the multi-source runner
+@register_source
+class DCLibrarySource(Source):
+    name = SOURCE_NAME
+
+    def scrape(self, sink, seen_index=None, max_workers=None, deadline=None):
+        scrape_dc_library(
+            max_workers=max_workers or MAX_FETCH_WORKERS,
+            deadline=deadline or FETCH_DEADLINE,
+            seen_index=seen_index,
+            sink=sink,
+        )
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Scrape DC Library workshops from the libnet RSS feeds")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="skip items unchanged since the last run and save only new or changed workshops")
+    arg_parser.add_argument("--seen-index", default=DEFAULT_SEEN_INDEX_PATH,
+                            help="seen items index used by --incremental")
+    arg_parser.add_argument("--format", choices=FORMATS, default="ndjson",
+                            help="write one workshop per line (ndjson) or a single compact JSON array (json)")
+    arg_parser.add_argument("--db", metavar="PATH",
+                            help="upsert workshops into this SQLite database instead of writing a file")
+    arg_parser.add_argument("--report", metavar="PATH",
+                            help="write per-stage timings and item counters for the run to this JSON file")
+    arg_parser.add_argument("--prometheus", metavar="PATH",
+                            help="write the same metrics in Prometheus text format to this file")
+    arg_parser.add_argument("--locations", nargs="+", metavar="NAME", choices=list(library_location_codes),
+                            help="only scrape these libraries, all of them by default")
+    arg_parser.add_argument("--horizon-days", type=int,
+                            help="skip events more than this many days ahead")
+    arg_parser.add_argument("--batched", action="store_true",
+                            help="request combined feeds for batches of libraries, falling back per library "
+                                 "when an item does not name its library and age group")
+    add_verbosity_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    configure_logging(args.verbose, args.quiet)
+
     log.info("Starting DC Library RSS Events Scraper")
     
-    workshops = scrape_dc_library_rss(True)
-    title_set = set()
-
-    for workshop in workshops:
-        title_set.add(workshop['title'])
-    workshops.extend(scrape_dc_library_rss(False, title_set))
-    if workshops:
-        log.info("Found {} workshops: ".format(len(workshops)))
-    
-        try:
-            filename = f"dc_library_workshops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(workshops, f, indent=2, ensure_ascii=False)
-            log.info(f"\nData saved to: {filename}")
-        except Exception as e:
-            log.error(f"Could not save to file {filename}: {e}")
-        
+    seen_index = SeenIndex(args.seen_index) if args.incremental else None
+    prefix = "dc_library_workshops_delta" if seen_index else "dc_library_workshops"
+    if args.db:
+        filename = args.db
+        sink = WorkshopStore(args.db)
     else:
-        log.warning("\nNo workshops found.")
-    
-    return workshops
+        filename = output_filename(f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}", args.format)
+        sink = WorkshopSink(filename, format=args.format)
+    try:
+        scrape = scrape_dc_library_rss_batched if args.batched else scrape_dc_library
+        scrape(seen_index=seen_index, sink=sink, locations=args.locations, horizon_days=args.horizon_days)
+    except Exception as e:
+        log.error("Scrape run failed, discarding %s: %s", filename, e)
+        sink.abort()
+    saved = sink.close()
+
+    if sink.count:
+        log.info("Found %s workshops", sink.count)
+    else:
+        log.warning("No workshops found.")
+
+    if seen_index is not None:
+        # Only remember the items once the delta holding them is on disk
+        if saved:
+            seen_index.commit()
+        seen_index.close()
+
+    log_timing_summary()
+    metrics.save(args.report, args.prometheus)
+    item_log.summary()
+    return sink.count
 
 if __name__ == "__main__":
-    workshops = main()
\ No newline at end of file
+    main()
\ No newline at end of file
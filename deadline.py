@@ -0,0 +1,54 @@
+import time
+
+class DeadlineExceeded(Exception):
+    pass
+
+"""
+A point in time that a scrape has to finish by, on the monotonic clock.
+One Deadline is passed down to every pool and request of a run, so each
+request's timeout is the time left rather than a fixed 30s and no new
+work starts once it has expired. Deadline(None) never expires
+"""
+class Deadline:
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    """
+    Returns the seconds left, or None when there is no deadline
+    """
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    """
+    Returns timeout cut down to the time left
+    Raises DeadlineExceeded when no time is left
+    """
+    def timeout(self, timeout):
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s reached")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    """
+    Wraps an iterable, e.g. a streamed body, raising DeadlineExceeded if it
+    expires before the iterable is exhausted
+    """
+    def guard(self, iterable):
+        for value in iterable:
+            if self.expired():
+                raise DeadlineExceeded(f"Deadline of {self.seconds}s reached")
+            yield value
+
+"""
+Returns deadline as a Deadline, given one or a number of seconds from now
+"""
+def as_deadline(deadline):
+    return deadline if isinstance(deadline, Deadline) else Deadline(deadline)
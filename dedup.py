@@ -0,0 +1,235 @@
+import re
+import random
+import hashlib
+from functools import lru_cache
+import threading
+import logging
+
+log = logging.getLogger("dedup")
+
+# Title similarity at or above which two events on the same day can be the same event
+TITLE_THRESHOLD = 0.85
+# Description similarity needed to merge re-titled events at one venue, or
+# same titled events listed at several venues
+DESCRIPTION_THRESHOLD = 0.8
+CROSS_VENUE_DESCRIPTION_THRESHOLD = 0.9
+
+# MinHash signatures of NUM_HASHES values split into BANDS bands. Records
+# sharing a band of their title signature on the same date, or of their
+# description signature on the same date and venue, are compared. This finds
+# pairs with a similarity above about (1 / BANDS) ** (BANDS / NUM_HASHES)
+NUM_HASHES = 32
+BANDS = 8
+# Each MinHash function is the shingle's hash XORed with a random mask, about
+# three times cheaper in Python than the usual (a * h + b) % p
+_seeds = random.Random(16658)
+_hash_masks = [_seeds.getrandbits(64) for _ in range(NUM_HASHES)]
+
+_non_word = re.compile(r'[^a-z0-9]+')
+_venue_noise = re.compile(r'\b(?:the|neighborhood|library|museum|of|national|smithsonian)\b')
+
+def _normalize(text):
+    return _non_word.sub(' ', (text or "").lower()).strip()
+
+def normalize_venue(workshop):
+    venue = workshop.get('venue') or workshop.get('location') or ""
+    return ' '.join(_venue_noise.sub(' ', _normalize(venue)).split())
+
+def title_shingles(title, size=3):
+    text = _normalize(title)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def description_shingles(description, size=3):
+    words = _normalize(description).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+# A stable 64 bit hash rather than the builtin hash(), which is salted per
+# process, so signatures and the band matches they give are reproducible
+@lru_cache(maxsize=65536)
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+
+def minhash(shingles):
+    hashes = [_shingle_hash(shingle) for shingle in shingles]
+    if not hashes:
+        return ()
+    return tuple(min([h ^ mask for h in hashes]) for mask in _hash_masks)
+
+class _Record:
+    __slots__ = ('index', 'workshop', 'date', 'venue', 'time', 'title', 'description', 'title_signature', 'description_signature')
+
+    def __init__(self, index, workshop):
+        self.index = index
+        self.workshop = workshop
+        self.date = workshop.get('date')
+        self.venue = normalize_venue(workshop)
+        time = workshop.get('time')
+        self.time = time[0] if isinstance(time, (list, tuple)) else time
+        self.title = title_shingles(workshop.get('title'))
+        self.description = description_shingles(workshop.get('description'))
+        self.title_signature = minhash(self.title)
+        self.description_signature = minhash(self.description)
+
+"""
+Returns the reason two records are the same event, or None
+"""
+def _match(a, b):
+    if a.workshop.get('url') and a.workshop.get('url') == b.workshop.get('url') and a.time == b.time:
+        return "same url"
+    if a.time and b.time and a.time != b.time:
+        return None
+    title_similarity = jaccard(a.title, b.title)
+    if a.venue == b.venue:
+        if title_similarity >= TITLE_THRESHOLD:
+            return f"title {title_similarity:.2f} at one venue"
+        description_similarity = jaccard(a.description, b.description)
+        if description_similarity >= DESCRIPTION_THRESHOLD:
+            return f"description {description_similarity:.2f} at one venue"
+        return None
+    # The same title at different branches is usually a separate session,
+    # only near identical listings are merged
+    if title_similarity >= TITLE_THRESHOLD:
+        description_similarity = jaccard(a.description, b.description)
+        if description_similarity >= CROSS_VENUE_DESCRIPTION_THRESHOLD:
+            return f"title {title_similarity:.2f}, description {description_similarity:.2f} across venues"
+    return None
+
+def _bands(signature):
+    rows = NUM_HASHES // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)] if signature else []
+
+def _blocks(records):
+    blocks = {}
+    for record in records:
+        if not record.date:
+            continue
+        if record.workshop.get('url'):
+            blocks.setdefault(('url', record.date, record.workshop['url']), []).append(record)
+        for band in _bands(record.title_signature):
+            blocks.setdefault(('title', record.date) + band, []).append(record)
+        for band in _bands(record.description_signature):
+            blocks.setdefault(('description', record.date, record.venue) + band, []).append(record)
+    return blocks.values()
+
+def _find(parents, index):
+    while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+    return index
+
+"""
+Merges workshops that describe the same event: the same event listed at
+several branches, re-titled events, and events in more than one feed.
+Records are only compared within blocks sharing a date and the url, a
+MinHash band of the title, or a normalized venue and a MinHash band of the
+description, so the work grows with the number of events rather than the
+number of pairs.
+The first record of each group, in input order, is kept
+Returns (kept workshops, merge report), the report listing each kept
+record with the records merged into it and why
+"""
+def deduplicate(workshops):
+    records = [_Record(index, workshop) for index, workshop in enumerate(workshops)]
+    parents = list(range(len(records)))
+    reasons = {}
+    compared = set()
+
+    for block in _blocks(records):
+        if len(block) < 2:
+            continue
+        for i, a in enumerate(block):
+            for b in block[i + 1:]:
+                pair = (a.index, b.index)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                root_a, root_b = _find(parents, a.index), _find(parents, b.index)
+                if root_a == root_b:
+                    continue
+                reason = _match(a, b)
+                if reason:
+                    keep, drop = min(root_a, root_b), max(root_a, root_b)
+                    parents[drop] = keep
+                    reasons[drop] = reason
+
+    groups = {}
+    for record in records:
+        groups.setdefault(_find(parents, record.index), []).append(record.index)
+
+    kept = []
+    report = []
+    for record in records:
+        members = groups.get(record.index)
+        if members is None:
+            continue
+        kept.append(record.workshop)
+        if len(members) > 1:
+            report.append({
+                'kept': _summary(record.workshop),
+                'merged': [
+                    dict(_summary(workshops[index]), reason=reasons.get(index))
+                    for index in members[1:]
+                ],
+            })
+
+    log.info("De-duplicated %s workshops to %s, %s pairs compared", len(workshops), len(kept), len(compared))
+    for entry in report:
+        for merged in entry['merged']:
+            log.debug("Merged '%s' (%s) into '%s': %s", merged['title'], merged['venue'], entry['kept']['title'], merged['reason'])
+    return kept, report
+
+def _summary(workshop):
+    return {
+        'title': workshop.get('title'),
+        'date': workshop.get('date'),
+        'venue': workshop.get('venue') or workshop.get('location'),
+        'url': workshop.get('url'),
+        'source': workshop.get('source') or workshop.get('submittedBy'),
+    }
+
+"""
+Sink that collects workshops and writes the de-duplicated set to another
+sink on close. It has to hold the whole run, so streaming stops at this stage
+"""
+class DedupSink:
+    def __init__(self, sink):
+        self.sink = sink
+        self.report = []
+        self._workshops = []
+        self._lock = threading.Lock()
+        self.failed = False
+
+    @property
+    def count(self):
+        return self.sink.count
+
+    def write(self, workshop):
+        with self._lock:
+            self._workshops.append(workshop)
+
+    def close(self):
+        if not self.failed:
+            try:
+                kept, self.report = deduplicate(self._workshops)
+                for workshop in kept:
+                    self.sink.write(workshop)
+            except Exception as e:
+                log.error("De-duplication failed: %s", e)
+                self.failed = True
+                return self.sink.abort()
+        self._workshops = []
+        return self.sink.close()
+
+    def abort(self):
+        self.failed = True
+        self._workshops = []
+        return self.sink.abort()
@@ -0,0 +1,75 @@
+import re
+from html import unescape
+
+# Trumba descriptions are <br/>-separated lines: the date/time line, the
+# event text, then labeled lines such as <b>Venue</b>:&nbsp;...
+_line_break = re.compile(r'<br\s*/?>', re.I)
+_paragraph_break = re.compile(r'<br/><br/>')
+_tag = re.compile(r'<[^>]+>')
+_whitespace = re.compile(r'\s+')
+_labeled_line = re.compile(
+    r'^\s*(?:<b>)?\s*(Venue|Event Location|Sponsor|Cost|Categories|Recommended Audience)\s*(?:</b>)?\s*:(.*)$',
+    re.I | re.S
+)
+# Recommended Audience is not always on a line of its own
+_inline_audience = re.compile(r'Recommended Audience:(?:&nbsp;|\s)*([^<\n]+)')
+
+LABELS = {
+    'venue': 'venue',
+    'event location': 'event_location',
+    'sponsor': 'sponsor',
+    'cost': 'cost',
+    'categories': 'categories',
+    'recommended audience': 'audience',
+}
+
+"""
+Converts an HTML fragment to whitespace-normalized text
+"""
+def html_to_text(fragment):
+    text = unescape(_tag.sub(' ', fragment)).replace('\xa0', ' ')
+    return _whitespace.sub(' ', text).strip()
+
+"""
+A Smithsonian RSS item description tokenized once into its labeled fields.
+html is the raw description, text its full plain text, date_line the plain
+text of the leading date/time line and body the event text
+"""
+class EventDescription:
+    __slots__ = ('html', 'text', 'date_line', 'body', 'venue', 'event_location',
+                 'sponsor', 'cost', 'categories', 'audience')
+
+    def __init__(self, html):
+        self.html = html or ""
+        self.text = html_to_text(self.html)
+        for field in LABELS.values():
+            setattr(self, field, "")
+
+        lines = _line_break.split(self.html)
+        self.date_line = html_to_text(lines[0]) if lines else ""
+
+        paragraphs = _paragraph_break.split(self.html)
+        self.body = html_to_text(paragraphs[1] if len(paragraphs) >= 2 else paragraphs[0])
+
+        for line in lines:
+            match = _labeled_line.match(line)
+            if match:
+                field = LABELS[match.group(1).lower()]
+                if not getattr(self, field):
+                    setattr(self, field, html_to_text(match.group(2)))
+
+        if not self.audience:
+            match = _inline_audience.search(self.html)
+            if match:
+                self.audience = html_to_text(match.group(1))
+
+    def __bool__(self):
+        return bool(self.html)
+
+"""
+Returns the EventDescription for a raw description, passing parsed ones through
+"""
+def parse_event_description(description):
+    if isinstance(description, EventDescription):
+        return description
+    return EventDescription(description)
@@ -0,0 +1,75 @@
+import logging
+from datetime import timedelta
+from urllib.parse import urlencode
+
+log = logging.getLogger("feed_planner")
+
+SHARD_SIZES = ("week", "month")
+# Trumba feed parameters selecting the date window: the first day as YYYYMMDD and its length in days
+START_PARAM = "startdate"
+DAYS_PARAM = "days"
+
+"""
+Splits the horizon_days starting at start into per-week or per-calendar-month shards
+Returns list of (first day, number of days) tuples in date order
+"""
+def plan_shards(start, horizon_days, shard_size="month"):
+    if shard_size not in SHARD_SIZES:
+        raise ValueError(f"Unknown shard size {shard_size!r}, expected one of {SHARD_SIZES}")
+    end = start + timedelta(days=horizon_days)
+    shards = []
+    day = start
+    while day < end:
+        if shard_size == "week":
+            next_day = day + timedelta(days=7)
+        else:
+            next_day = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+        next_day = min(next_day, end)
+        shards.append((day, (next_day - day).days))
+        day = next_day
+    return shards
+
+"""
+Halves a shard whose feed came back truncated
+Returns the two halves, or None for a single day that cannot be split
+"""
+def split_shard(shard):
+    start, days = shard
+    if days <= 1:
+        return None
+    half = days // 2
+    return [(start, half), (start + timedelta(days=half), days - half)]
+
+"""
+Returns the feed url restricted to the shard's date window
+"""
+def shard_url(base_url, shard):
+    start, days = shard
+    separator = "&" if "?" in base_url else "?"
+    return base_url + separator + urlencode({START_PARAM: start.strftime("%Y%m%d"), DAYS_PARAM: days})
+
+def _item_link(item):
+    return (item.get('link') or item.get('guid') or "").strip()
+
+"""
+Merges the items of each shard, given in shard order, into one stream.
+An event whose link an earlier shard already listed, like a multi-day event
+spanning two windows, is dropped. Items within one shard are never dropped,
+so a single shard passes through unchanged
+Yields item dicts
+"""
+def merge_shards(shard_items):
+    seen = set()
+    duplicates = 0
+    for items in shard_items:
+        links = set()
+        for item in items:
+            link = _item_link(item)
+            if link and link in seen:
+                duplicates += 1
+                continue
+            links.add(link)
+            yield item
+        seen.update(links)
+    if duplicates:
+        log.info("Dropped %s events listed by more than one shard", duplicates)
@@ -0,0 +1,221 @@
+import sqlite3
+import threading
+import time
+import logging
+from http_client import get_session, record_timing
+
+log = logging.getLogger("http_cache")
+
+DEFAULT_CACHE_PATH = ".http_cache.sqlite"
+# Entries older than this are dropped and fetched again unconditionally
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+"""
+Persistent conditional-GET cache for feed and page fetches.
+Stores the body with its ETag/Last-Modified, revalidates with
+If-None-Match/If-Modified-Since and serves the stored body on a 304.
+Entries expire after ttl seconds and the least recently used ones are
+evicted once the stored bodies exceed max_bytes.
+"""
+class HttpCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body, stored_at FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            if row and time.time() - row[3] > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._conn.commit()
+                return None
+            return row
+
+    def _store(self, url, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, len(body), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _touch(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    # Caller holds the lock
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            total -= size
+            log.debug("Evicted cached response: %s", url)
+
+    # Returns the request headers with the stored validators added, and the stored entry or None
+    def _conditional(self, url, headers):
+        headers = dict(headers or {})
+        cached = self._lookup(url)
+        if cached:
+            etag, last_modified, body, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers, cached
+
+    def get(self, url, headers=None, **kwargs):
+        headers, cached = self._conditional(url, headers)
+
+        started = time.perf_counter()
+        response = get_session().get(url, headers=headers, **kwargs)
+        record_timing(response.url, response.status_code, time.perf_counter() - started, len(response.content))
+        response.from_cache = False
+
+        if response.status_code == 304 and cached:
+            log.debug("Not modified, serving cached body: %s", url)
+            response.status_code = 200
+            response._content = cached[2]
+            response.from_cache = True
+            self._touch(url)
+        elif response.status_code == 200:
+            self._store(url, response)
+        return response
+
+    """
+    Conditional GET that yields the body in chunks as it downloads.
+    The chunks are kept only when the response has validators to cache.
+    The timing recorded covers the request and reading the body, but not
+    the time the caller spends between chunks
+    """
+    def stream(self, url, headers=None, chunk_size=64 * 1024, **kwargs):
+        headers, cached = self._conditional(url, headers)
+
+        started = time.perf_counter()
+        with get_session().get(url, headers=headers, stream=True, **kwargs) as response:
+            seconds = time.perf_counter() - started
+            received = 0
+            try:
+                if response.status_code == 304 and cached:
+                    log.debug("Not modified, serving cached body: %s", url)
+                    self._touch(url)
+                    yield CachedBody(cached[2])
+                    return
+                response.raise_for_status()
+
+                keep = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                chunks = []
+                body = response.iter_content(chunk_size=chunk_size)
+                while True:
+                    started = time.perf_counter()
+                    chunk = next(body, None)
+                    seconds += time.perf_counter() - started
+                    if chunk is None:
+                        break
+                    received += len(chunk)
+                    if keep:
+                        chunks.append(chunk)
+                    yield chunk
+                if keep:
+                    response._content = b"".join(chunks)
+                    self._store(url, response)
+            finally:
+                record_timing(response.url, response.status_code, seconds, received)
+
+    """
+    Conditional GET through an aiohttp ClientSession, for the async engine.
+    Returns a FetchedResponse with the whole body read
+    """
+    async def get_async(self, session, url, headers=None, **kwargs):
+        headers, cached = self._conditional(url, headers)
+        started = time.perf_counter()
+        async with session.get(url, headers=headers, **kwargs) as response:
+            content = await response.read()
+            fetched = FetchedResponse(str(response.url), response.status, response.headers, content)
+        record_timing(fetched.url, fetched.status_code, time.perf_counter() - started, len(content))
+
+        if fetched.status_code == 304 and cached:
+            log.debug("Not modified, serving cached body: %s", url)
+            fetched.status_code = 200
+            fetched.content = cached[2]
+            fetched.from_cache = True
+            self._touch(url)
+        elif fetched.status_code == 200:
+            self._store(url, fetched)
+        return fetched
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+"""
+A body stream() served from the cache after a 304, marked so byte
+counters can tell it from data read off the network
+"""
+class CachedBody(bytes):
+    from_cache = True
+
+"""
+A response read in full by get_async, with the attributes the scrapers
+use on a requests.Response
+"""
+class FetchedResponse:
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+"""
+Returns the cache shared by both scrapers, opening it on first use
+"""
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
+
+"""
+Drop-in replacement for requests.get that goes through the shared cache and session
+"""
+def cached_get(url, headers=None, **kwargs):
+    return get_default_cache().get(url, headers=headers, **kwargs)
+
+"""
+Streaming counterpart of cached_get, yields the response body in chunks
+"""
+def cached_stream(url, headers=None, **kwargs):
+    return get_default_cache().stream(url, headers=headers, **kwargs)
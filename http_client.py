@@ -0,0 +1,120 @@
+import requests
+import random
+import threading
+import logging
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger("http_client")
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 16
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+BACKOFF_MAX = 30
+BACKOFF_JITTER = 0.5
+# 429 and 503 are left to the callers, which honour Retry-After per domain
+RETRY_STATUSES = (500, 502, 504)
+
+try:
+    import brotli  # noqa: F401 urllib3 decodes br responses when this is installed
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+"""
+Retry policy with exponential backoff plus random jitter
+"""
+class JitterRetry(Retry):
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return min(BACKOFF_MAX, backoff + random.uniform(0, BACKOFF_JITTER))
+
+_timings = []
+_timings_lock = threading.Lock()
+
+"""
+Records one request in the per-host timing summary. Callers record once
+the body is read, with its decoded length and the total time taken
+"""
+def record_timing(url, status, seconds, size):
+    with _timings_lock:
+        _timings.append({
+            'url': url,
+            'host': urlparse(url).netloc,
+            'status': status,
+            'seconds': seconds,
+            'bytes': size,
+        })
+
+"""
+Builds a session with pooled keep-alive connections per host, retries and compression
+Returns the requests.Session
+"""
+def build_session(max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_maxsize=POOL_MAXSIZE):
+    retry = JitterRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': ACCEPT_ENCODING,
+    })
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+"""
+Returns the session shared by both scrapers, building it on first use
+"""
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+"""
+Returns a copy of the per-request timings recorded so far
+"""
+def request_timings():
+    with _timings_lock:
+        return list(_timings)
+
+"""
+Logs request count, bytes and time per host
+"""
+def log_timing_summary():
+    by_host = {}
+    for timing in request_timings():
+        host = by_host.setdefault(timing['host'], {'requests': 0, 'bytes': 0, 'seconds': 0.0, 'slowest': 0.0})
+        host['requests'] += 1
+        host['bytes'] += timing['bytes']
+        host['seconds'] += timing['seconds']
+        host['slowest'] = max(host['slowest'], timing['seconds'])
+    for host, stats in sorted(by_host.items()):
+        log.info(
+            "%s: %s requests, %s bytes, %.2fs total, %.2fs avg, %.2fs slowest", host, stats['requests'], stats['bytes'], stats['seconds'], stats['seconds'] / stats['requests'], stats['slowest']
+        )
@@ -0,0 +1,112 @@
+import re
+from datetime import date
+
+# Staged early-exit checks on raw feed items. A filter takes the item dict
+# straight from the feed and returns the reason to skip it, or None to keep
+# it. Scrapers run their filters cheapest first with run_filters, so HTML
+# cleaning, classification and price lookups only run for items that pass
+
+_cancelled_anywhere = re.compile(r'CANCELL?ED')
+_cancelled_prefix = re.compile(r'^\W*cancell?ed\b', re.I)
+_category_date = re.compile(r'(\d{4})/(\d{2})/(\d{2})')
+# Trumba's labeled venue lines, e.g. <b>Venue</b>:&nbsp;National Zoo
+_raw_place = re.compile(r'<b>\s*(?:Venue|Event Location)\s*</b>\s*:(?:&nbsp;|\s|\xa0)*([^<]+)', re.I)
+
+"""
+Returns the reason given by the first filter that rejects item, or None if all pass
+"""
+def run_filters(filters, item):
+    for check in filters:
+        reason = check(item)
+        if reason:
+            return reason
+    return None
+
+"""
+Rejects items whose title is marked cancelled, in capitals anywhere or as a leading word in any case
+"""
+def cancelled_filter(field='title'):
+    def check(item):
+        text = item.get(field, "")
+        if _cancelled_anywhere.search(text) or _cancelled_prefix.match(text):
+            return "cancelled"
+        return None
+    return check
+
+"""
+Rejects items without a meaningful title, or whose title is in title_set
+"""
+def title_filter(title_set=None, min_length=3):
+    def check(item):
+        title = item.get('title', "").strip()
+        if len(title) < min_length:
+            return "no_title"
+        if title_set is not None and title in title_set:
+            return "duplicate"
+        return None
+    return check
+
+"""
+Rejects items dated before start or after end (when given). item_date reads
+the date cheaply from the raw item, returning None when it cannot, in which
+case the item is left for the full parse to decide
+"""
+def date_window_filter(item_date, start=None, end=None):
+    start = start or date.today()
+
+    def check(item):
+        event_date = item_date(item)
+        if event_date is None:
+            return None
+        if event_date < start:
+            return "past"
+        if end is not None and event_date > end:
+            return "outside_window"
+        return None
+    return check
+
+"""
+Rejects items whose place is known and matches none of wanted, a list of
+lowercase substrings. item_places returns the raw place names of an item,
+an item with none is kept
+"""
+def location_filter(item_places, wanted):
+    wanted = [name.lower() for name in wanted]
+
+    def check(item):
+        places = [place.lower() for place in item_places(item)]
+        if not places or any(name in place for place in places for name in wanted):
+            return None
+        return "unwanted_location"
+    return check
+
+"""
+Rejects items an earlier run already processed unchanged. It hashes the item
+and queries the index, and marks every item it checks, so keep it after the
+cheap checks unless one of them depends on what else the run emitted, e.g.
+title_filter with a title_set, and an item it drops would go unmarked
+"""
+def seen_filter(seen_index, source):
+    def check(item):
+        if seen_index.is_unchanged(source, item):
+            return "unchanged"
+        return None
+    return check
+
+"""
+Returns the date in a Trumba item's <category>, e.g. '2024/05/03 (Fri)', or None
+"""
+def category_date(item):
+    match = _category_date.search(item.get('category', ""))
+    if not match:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+
+"""
+Returns the Venue and Event Location values in a raw Trumba description
+"""
+def trumba_places(item):
+    return [place.strip() for place in _raw_place.findall(item.get('description', "")) if place.strip()]
@@ -0,0 +1,59 @@
+import re
+
+def _trie(keywords):
+    root = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return root
+
+def _trie_pattern(node):
+    end = '' in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 and not end else '(?:' + '|'.join(branches) + ')'
+    # The optional tail is greedy, so the longest keyword is tried first
+    return pattern + '?' if end else pattern
+
+"""
+Matches several named keyword sets against a text in a single pass.
+All keywords are compiled into one trie-shaped regex, the regex-engine
+equivalent of an Aho-Corasick automaton, tried at every position of the
+text. A keyword only matches as a whole word, so 'ages' does not match
+inside 'pages'
+"""
+class KeywordClassifier:
+    def __init__(self, keyword_sets):
+        self.sets = {}
+        for name, keywords in keyword_sets.items():
+            for keyword in keywords:
+                self.sets.setdefault(keyword.lower(), []).append(name)
+        self.names = list(keyword_sets)
+
+        # A match on 'family program' also means 'family' matched at that position
+        self.implied = {
+            keyword: [other for other in self.sets if other != keyword and keyword.startswith(other)
+                      and not keyword[len(other)].isalnum()]
+            for keyword in self.sets
+        }
+        self.regex = re.compile(r'\b(?=(' + _trie_pattern(_trie(self.sets)) + r')(?!\w))')
+
+    """
+    Returns a dict of set name to the keywords of that set found in the text,
+    in order of first appearance
+    """
+    def match(self, text):
+        matches = {name: [] for name in self.names}
+        seen = set()
+        for found in self.regex.finditer(text.lower()):
+            keyword = found.group(1)
+            for matched in [keyword] + self.implied[keyword]:
+                if matched in seen:
+                    continue
+                seen.add(matched)
+                for name in self.sets[matched]:
+                    matches[name].append(matched)
+        return matches
@@ -0,0 +1,89 @@
+import logging
+import threading
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Libraries whose debug output drowns the scrapers' own
+THIRD_PARTY_LOGGERS = ("urllib3", "chardet", "charset_normalizer", "bs4")
+# At -v, per-item messages are logged for the first item and every ITEM_LOG_EVERY-th after
+ITEM_LOG_EVERY = 100
+
+_item_every = ITEM_LOG_EVERY
+# The (verbose, quiet) of the last configure_logging call, None until one is made
+_settings = None
+
+"""
+Adds the -v / -q flags every entry point shares
+"""
+def add_verbosity_arguments(parser):
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="-v logs a sample of per-item messages, -vv every item, -vvv library debug output too")
+    parser.add_argument("-q", "--quiet", action="count", default=0,
+                        help="-q logs warnings and errors only, -qq errors only")
+
+"""
+Configures the root logger for a command line run. Only entry points call
+this, so importing a scraper never changes the host application's logging
+"""
+def configure_logging(verbose=0, quiet=0):
+    global _item_every, _settings
+    _settings = (verbose, quiet)
+    level = logging.INFO + 10 * (quiet - min(verbose, 1))
+    level = max(logging.DEBUG, min(logging.ERROR, level))
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
+    for name in THIRD_PARTY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.DEBUG if verbose >= 3 else logging.WARNING)
+    _item_every = 1 if verbose >= 2 else ITEM_LOG_EVERY
+    return level
+
+"""
+Returns what a spawned process needs to log like this one, for
+configure_worker_logging: the configure_logging settings, or None when
+only the host application configured logging, and the root level
+"""
+def worker_logging():
+    return _settings, logging.getLogger().level
+
+"""
+Configures logging in a spawned process from worker_logging() of its
+parent, which a spawned process does not inherit. With the parent's -v / -q
+settings it calls configure_logging, so third-party loggers and item
+sampling match, otherwise it only sets the parent's root level
+"""
+def configure_worker_logging(settings, level):
+    if settings is not None:
+        configure_logging(*settings)
+    else:
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+
+"""
+Per-item debug messages, sampled. Nothing is formatted or counted while
+debug logging is off. When it is on, each message is logged the first time
+and then every ITEM_LOG_EVERY-th time with its running count (every time at
+-vv), and summary() logs the totals
+"""
+class ItemLogger:
+    def __init__(self, logger):
+        self.logger = logger
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def debug(self, msg, *args):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        with self._lock:
+            count = self._counts.get(msg, 0) + 1
+            self._counts[msg] = count
+        if _item_every == 1:
+            self.logger.debug(msg, *args)
+        elif count == 1 or count % _item_every == 0:
+            self.logger.debug(msg + " (#%d)", *args, count)
+
+    def summary(self):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        with self._lock:
+            counts = sorted(self._counts.items(), key=lambda entry: -entry[1])
+            self._counts = {}
+        for msg, count in counts:
+            self.logger.debug("%d x %r", count, msg)
@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+log = logging.getLogger("metrics")
+
+STAGES = ("fetch", "xml_parse", "html_parse", "date_extraction", "price_scrape", "output")
+PROMETHEUS_PREFIX = "workshop_scraper"
+
+"""
+Per-stage durations and item counters for one scrape run, keyed by source
+and, for the DC library, location.
+Stage time is exclusive: while a nested stage runs on the same thread the
+outer one is paused, so a streamed feed's download time is counted under
+fetch and not again under the xml_parse wrapped around it
+"""
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._stages = {}
+            self._counters = {}
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def observe(self, stage, seconds, source, location=None):
+        key = (stage, source, location)
+        with self._lock:
+            calls, total = self._stages.get(key, (0, 0.0))
+            self._stages[key] = (calls + 1, total + seconds)
+
+    def count(self, name, source, location=None, reason=None, n=1):
+        key = (name, source, location, reason)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    """
+    Returns the raw stage and counter totals, for merge() into another RunMetrics
+    """
+    def snapshot(self):
+        with self._lock:
+            return dict(self._stages), dict(self._counters)
+
+    """
+    Adds the totals of a snapshot(), e.g. one taken in a worker process
+    """
+    def merge(self, snapshot):
+        stages, counters = snapshot
+        with self._lock:
+            for key, (calls, total) in stages.items():
+                old_calls, old_total = self._stages.get(key, (0, 0.0))
+                self._stages[key] = (old_calls + calls, old_total + total)
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    """
+    Context manager timing the enclosed block as one call of stage
+    """
+    @contextmanager
+    def stage(self, stage, source, location=None):
+        stack = self._stack()
+        now = time.perf_counter()
+        if stack:
+            stack[-1][1] += now - stack[-1][0]
+        frame = [now, 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            stack.pop()
+            self.observe(stage, frame[1] + now - frame[0], source, location)
+            if stack:
+                stack[-1][0] = now
+
+    """
+    Wraps an iterable so the time spent producing each element counts toward stage
+    """
+    def timed_iter(self, iterable, stage, source, location=None):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage, source, location):
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    return
+            yield value
+
+    """
+    Wraps an iterable of downloaded byte chunks, timing it as fetch and counting bytes_downloaded.
+    Chunks marked from_cache, a body served from the HTTP cache after a 304,
+    are counted as bytes_from_cache instead
+    """
+    def download(self, chunks, source, location=None):
+        received = 0
+        from_cache = 0
+        try:
+            for chunk in self.timed_iter(chunks, "fetch", source, location):
+                if getattr(chunk, 'from_cache', False):
+                    from_cache += len(chunk)
+                else:
+                    received += len(chunk)
+                yield chunk
+        finally:
+            self.count("bytes_downloaded", source, location, n=received)
+            if from_cache:
+                self.count("bytes_from_cache", source, location, n=from_cache)
+
+    """
+    Counts a response's body as bytes_downloaded, or as bytes_from_cache when the HTTP cache served it
+    """
+    def count_response(self, response, source, location=None):
+        name = "bytes_from_cache" if getattr(response, 'from_cache', False) else "bytes_downloaded"
+        self.count(name, source, location, n=len(response.content))
+
+    """
+    Returns the run as a JSON-serializable dict
+    """
+    def report(self):
+        with self._lock:
+            stages = [
+                {'stage': stage, 'source': source, 'location': location, 'calls': calls, 'seconds': round(total, 6)}
+                for (stage, source, location), (calls, total) in sorted(self._stages.items(), key=_sort_key)
+            ]
+            counters = [
+                {'name': name, 'source': source, 'location': location, 'reason': reason, 'value': value}
+                for (name, source, location, reason), value in sorted(self._counters.items(), key=_sort_key)
+            ]
+            started = self.started
+        return {
+            'started_at': datetime.fromtimestamp(started).isoformat(),
+            'duration_seconds': round(time.time() - started, 3),
+            'stages': stages,
+            'counters': counters,
+        }
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        log.info("Run report saved to %s", path)
+
+    """
+    Returns the run in the Prometheus text exposition format
+    """
+    def prometheus_text(self):
+        report = self.report()
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds_total Time spent in each pipeline stage",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds_total counter",
+        ]
+        lines += [f"{PROMETHEUS_PREFIX}_stage_seconds_total{_labels(entry, 'stage', 'source', 'location')} {entry['seconds']}"
+                  for entry in report['stages']]
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_calls_total Calls of each pipeline stage",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_calls_total counter",
+        ]
+        lines += [f"{PROMETHEUS_PREFIX}_stage_calls_total{_labels(entry, 'stage', 'source', 'location')} {entry['calls']}"
+                  for entry in report['stages']]
+        for name in sorted({entry['name'] for entry in report['counters']}):
+            lines += [f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter"]
+            lines += [f"{PROMETHEUS_PREFIX}_{name}_total{_labels(entry, 'source', 'location', 'reason')} {entry['value']}"
+                      for entry in report['counters'] if entry['name'] == name]
+        lines += [
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds {report['duration_seconds']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        log.info("Prometheus metrics saved to %s", path)
+
+    """
+    Writes the run report and Prometheus dump to whichever paths are given, logging failures
+    """
+    def save(self, report_path=None, prometheus_path=None):
+        try:
+            if report_path:
+                self.write_report(report_path)
+            if prometheus_path:
+                self.write_prometheus(prometheus_path)
+        except Exception as e:
+            log.error("Could not save run metrics: %s", e)
+
+def _sort_key(item):
+    return tuple("" if part is None else str(part) for part in item[0])
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(entry, *names):
+    labels = [f'{name}="{_escape(entry[name])}"' for name in names if entry.get(name) is not None]
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+# Shared by every scraper in the process
+metrics = RunMetrics()
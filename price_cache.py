@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import time
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+log = logging.getLogger("price_cache")
+
+DEFAULT_PRICE_CACHE_PATH = ".price_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 60 * 60
+# Pages without a price are retried sooner, they may get one once ticketing opens
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+
+"""
+Normalizes a ticketing or event page URL for use as a cache key.
+Lowercases the scheme and host, drops the fragment, tracking parameters
+and trailing slash, and sorts the query parameters
+"""
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+"""
+Persistent memo of scraped prices keyed by normalized URL.
+Stores the extracted price, the pattern that matched it and when it was
+scraped. Pages where no price was found are cached too, for negative_ttl.
+"""
+class PriceCache:
+    def __init__(self, path=DEFAULT_PRICE_CACHE_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS prices ("
+            " url TEXT PRIMARY KEY,"
+            " price TEXT,"
+            " pattern TEXT,"
+            " scraped_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    """
+    Returns the cached (price, pattern) for the url, or None on a miss.
+    A cached negative result comes back with a None or empty price
+    """
+    def lookup(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT price, pattern, scraped_at FROM prices WHERE url = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        price, pattern, scraped_at = row
+        ttl = self.ttl if price else self.negative_ttl
+        if time.time() - scraped_at > ttl:
+            return None
+        return price, pattern
+
+    def store(self, url, price, pattern):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)",
+                (normalize_url(url), price, pattern, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_price_cache = None
+_default_price_cache_lock = threading.Lock()
+
+"""
+Returns the price cache shared by the price scrapers, opening it on first use
+"""
+def get_default_price_cache():
+    global _default_price_cache
+    with _default_price_cache_lock:
+        if _default_price_cache is None:
+            _default_price_cache = PriceCache()
+        return _default_price_cache
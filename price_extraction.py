@@ -0,0 +1,150 @@
+import re
+
+gen_admission_patterns = [
+    r'\$(\d+(?:\.\d{2})?)\s*(?:\n|\s)+gen\.?\s*admission',
+    r'\$(\d+(?:\.\d{2})?)\s*(?:\n|\s)+general\s*admission',
+    r'gen\.?\s*admission\s*(?:\n|\s)*\$(\d+(?:\.\d{2})?)',
+    r'general\s*admission\s*(?:\n|\s)*\$(\d+(?:\.\d{2})?)',
+    r'gen\.?\s*admission[:\s]*\$(\d+(?:\.\d{2})?)',
+    r'general\s*admission[:\s]*\$(\d+(?:\.\d{2})?)',
+]
+
+price_patterns = [
+    (r'\b(free admission|free entry|no admission fee|admission is free|entry is free|free of charge)\b', 'Free'),
+    (r'\b(free\s+event|this\s+event\s+is\s+free|no\s+charge)\b', 'Free'),
+    (r'\b(complimentary|free)\b(?![a-z])', 'Free'),
+    (r'non[\-\s]*member[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'registration[\s\-]*gen\.?\s*admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'museum\s+admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'adults?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'cost[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'price[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'fee[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'ticket[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'(?:admission|cost|price|fee|ticket).*?\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'\$(\d+(?:\.\d{2})?).*?(?:admission|cost|price|fee|ticket)', lambda m: f"${m.group(1)}"),
+    (r'admission.*?\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+    (r'\$(\d+(?:\.\d{2})?).*?admission', lambda m: f"${m.group(1)}"),
+    (r'included\s+with\s+museum\s+admission', 'Included with museum admission'),
+    (r'included\s+with\s+admission', 'Included with museum admission'),
+    (r'with\s+paid\s+museum\s+admission', 'Included with museum admission'),
+    (r'no\s+additional\s+cost', 'Included with museum admission'),
+    (r'\$(\d+(?:\.\d{2})?)\s*(?:per\s+person|each|adult)', lambda m: f"${m.group(1)}"),
+    (r'member[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
+]
+
+# Recorded in the price cache when a price came from the any-dollar-amount fallback
+DOLLAR_FALLBACK_PATTERN = "fallback:dollar_amount"
+
+# Characters kept on each side of a $ when narrowing the page to scan
+CURRENCY_WINDOW = 200
+# Joins the windows; no pattern can match across it
+_WINDOW_SEPARATOR = "\n\x00\n"
+
+_dollar_amount = re.compile(r'\$(\d+(?:\.\d{2})?)')
+
+def _dollar_result(match):
+    return f"${match.group(1)}"
+
+"""
+One precompiled price pattern.
+needs_currency rules only ever match around a $, so they are run over the
+currency windows instead of the whole page
+"""
+class PriceRule:
+    __slots__ = ('pattern', 'regex', 'result', 'needs_currency', 'label')
+
+    def __init__(self, pattern, result, label):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, re.I)
+        self.result = result
+        self.needs_currency = '\\$' in pattern
+        self.label = label
+
+    def price(self, match):
+        return self.result(match) if callable(self.result) else self.result
+
+"""
+Returns the parts of the lowercased page within CURRENCY_WINDOW of a $,
+overlapping windows merged, or "" if the page has no $
+"""
+def currency_windows(text, window=CURRENCY_WINDOW):
+    if '$' not in text:
+        return ""
+    spans = []
+    start = text.find('$')
+    while start != -1:
+        lo, hi = max(0, start - window), start + window
+        if spans and lo <= spans[-1][1]:
+            spans[-1][1] = hi
+        else:
+            spans.append([lo, hi])
+        start = text.find('$', start + 1)
+    return _WINDOW_SEPARATOR.join(text[lo:hi] for lo, hi in spans)
+
+"""
+Price extraction engine over precompiled rules.
+Rules are tried in priority order and the first one that matches anywhere
+wins, as with the original pattern lists. Rules that need a $ only scan
+the currency windows, which keeps the .*? patterns from backtracking over
+the whole page. If no rule matches, the first dollar amount within
+fallback_range is used
+"""
+class PriceExtractor:
+    def __init__(self, rules, fallback_range):
+        self.rules = rules
+        self.fallback_range = fallback_range
+
+    """
+    Returns a tuple of the price with any $ removed, the pattern that
+    matched and its label, or (None, None, None) if no price was found
+    """
+    def extract(self, page_text):
+        text = page_text.lower()
+        windows = currency_windows(text)
+
+        for rule in self.rules:
+            haystack = windows if rule.needs_currency else text
+            if not haystack:
+                continue
+            match = rule.regex.search(haystack)
+            if match:
+                return rule.price(match).replace('$', ''), rule.pattern, rule.label
+
+        low, high = self.fallback_range
+        for amount in _dollar_amount.findall(windows):
+            price_val = float(amount)
+            if low <= price_val <= high:
+                price = f"{price_val:.0f}" if price_val == int(price_val) else f"{price_val}"
+                return price, DOLLAR_FALLBACK_PATTERN, "potential"
+        return None, None, None
+
+gen_admission_rules = [PriceRule(pattern, _dollar_result, "General Admission") for pattern in gen_admission_patterns]
+price_rules = [PriceRule(pattern, result, "price") for pattern, result in price_patterns]
+
+associates_price_extractor = PriceExtractor(gen_admission_rules + price_rules, (5, 200))
+website_price_extractor = PriceExtractor(price_rules, (5, 100))
+
+# A feed Cost field often lists several prices, e.g. '$25 Members; $30 General Admission'
+non_member_patterns = [
+    r'non[\-\s]*member[s]?[:\s]*\$(\d+(?:\.\d{2})?)',
+    r'\$(\d+(?:\.\d{2})?)\s*(?:\(|\s)*non[\-\s]*member',
+]
+cost_field_rules = gen_admission_rules + [PriceRule(pattern, _dollar_result, "Non-member") for pattern in non_member_patterns]
+
+"""
+Returns the General Admission or non-member amount in a Cost field, or its
+only dollar amount when that is not a member price. Returns None when the
+field is ambiguous, so the price is looked up on the event's page instead
+"""
+def cost_field_price(cost):
+    text = cost.lower()
+    for rule in cost_field_rules:
+        match = rule.regex.search(text)
+        if match:
+            return match.group(1)
+    amounts = _dollar_amount.findall(text)
+    if len(amounts) == 1 and 'member' not in text:
+        return amounts[0]
+    return None
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+log = logging.getLogger("rate_limiter")
+
+DEFAULT_RATE = 1 / 1.5
+DEFAULT_BURST = 2
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    # Returns 0 once a token was taken, otherwise the seconds to wait before trying again
+    def try_take(self):
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+"""
+Per-domain token bucket rate limiter.
+Each host gets its own bucket refilled at rate tokens per second up to
+burst, so only requests to the same host throttle each other.
+"""
+class RateLimiter:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = _Bucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    """
+    Blocks until a request to the url's host is allowed
+    Raises DeadlineExceeded if deadline, a Deadline, expires first
+    """
+    def acquire(self, url, deadline=None):
+        bucket = self._bucket(url)
+        while True:
+            delay = bucket.try_take()
+            if delay <= 0:
+                return
+            time.sleep(deadline.timeout(delay) if deadline is not None else delay)
+
+    """
+    Waits without blocking the event loop until a request to the url's host is allowed
+    """
+    async def acquire_async(self, url):
+        bucket = self._bucket(url)
+        while True:
+            delay = bucket.try_take()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    """
+    Holds back every request to the url's host for the given number of seconds
+    """
+    def defer(self, url, seconds):
+        bucket = self._bucket(url)
+        with bucket.lock:
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+        log.info("Deferring requests to %s for %.1fs", urlparse(url).netloc, seconds)
+
+"""
+Parses a Retry-After header, given either in seconds or as an HTTP date.
+Returns the delay in seconds, or None if the header is missing or invalid
+"""
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,77 @@
+import xml.etree.ElementTree as ET
+import logging
+
+log = logging.getLogger("rss_stream")
+
+# Namespaced child tags are keyed by their usual RSS prefix, e.g. content:encoded
+NAMESPACE_PREFIXES = {
+    'http://purl.org/rss/1.0/modules/content/': 'content',
+    'http://www.w3.org/2005/Atom': 'atom',
+    'http://purl.org/dc/elements/1.1/': 'dc',
+}
+
+def _tag_name(tag):
+    if tag.startswith('{'):
+        uri, local = tag[1:].split('}', 1)
+        prefix = NAMESPACE_PREFIXES.get(uri)
+        return f"{prefix}:{local}" if prefix else local
+    return tag
+
+"""
+Flattens an <item> element into a dict of child tag to text.
+Like BeautifulSoup's find, only the first child of each tag is kept
+"""
+def item_fields(item):
+    fields = {}
+    for child in item:
+        name = _tag_name(child.tag)
+        if name not in fields:
+            fields[name] = "".join(child.itertext())
+    return fields
+
+"""
+Flattens a BeautifulSoup <item> tag into the same dict as item_fields
+"""
+def soup_item_fields(item):
+    fields = {}
+    for child in item.find_all(recursive=False):
+        name = f"{child.prefix}:{child.name}" if child.prefix else child.name
+        if name not in fields:
+            fields[name] = child.get_text()
+    return fields
+
+"""
+Incrementally parses an RSS feed from an iterable of byte chunks.
+Yields one item dict at a time and drops each <item> element once it has
+been read, so memory stays flat however long the feed is. Channel-level
+atom:link hrefs are recorded in the optional channel dict by rel
+"""
+def iter_rss_items(chunks, channel=None):
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    parent = None
+    in_item = False
+
+    def drain():
+        nonlocal parent, in_item
+        for event, elem in parser.read_events():
+            name = _tag_name(elem.tag)
+            if event == 'start':
+                if name == 'channel':
+                    parent = elem
+                elif name == 'item':
+                    in_item = True
+                continue
+            if name == 'item':
+                in_item = False
+                yield item_fields(elem)
+                elem.clear()
+                if parent is not None and elem in parent:
+                    parent.remove(elem)
+            elif name == 'atom:link' and not in_item and channel is not None and elem.get('rel'):
+                channel[elem.get('rel')] = elem.get('href', "")
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
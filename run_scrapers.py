@@ -0,0 +1,318 @@
+import argparse
+import importlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from datetime import datetime
+
+from sources import registered_sources
+from seen_index import SeenIndex, DEFAULT_SEEN_INDEX_PATH
+from workshop_sink import WorkshopSink, FORMATS, output_filename
+from workshop_store import WorkshopStore
+from dedup import DedupSink
+from workshop import as_workshop
+from metrics import metrics
+from deadline import Deadline
+from log_config import add_verbosity_arguments, configure_logging, configure_worker_logging, worker_logging
+from http_client import log_timing_summary, record_timing, request_timings
+
+log = logging.getLogger("run_scrapers")
+
+# Modules that register a Source when imported. A new venue adds its module here
+SOURCE_MODULES = [
+    "dc_library_scaper",
+    "smithsonian_scraper",
+]
+
+# Worker threads shared by every source, split evenly between them
+MAX_TOTAL_WORKERS = 16
+
+# "threads" runs each source's threaded scraper in a process of its own,
+# "async" runs them all on one event loop with async_engine, which needs aiohttp
+ENGINES = ("threads", "async")
+
+# A source's scraper stops itself at its timeout. Its process is killed if it
+# has not finished this many seconds later, so a run takes at most the
+# longest timeout plus STOP_GRACE
+STOP_GRACE = 5
+
+"""
+Sink handed to one source. Converts each workshop to a Workshop tagged with
+the source, drops any that fail schema validation, and drops writes once the
+runner has stopped waiting on the source
+"""
+class _SourceSink:
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+        self.count = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def write(self, workshop):
+        workshop = as_workshop(workshop, self.source)
+        problems = workshop.validate()
+        if problems:
+            log.warning("Dropping invalid workshop from %s, %s: %s", self.source, workshop.title, ", ".join(problems))
+            metrics.count("items_skipped", self.source, reason="invalid")
+            return
+        with self._lock:
+            if self.closed:
+                return
+            self.sink.write(workshop)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+
+def load_sources(modules=None):
+    for module in modules or SOURCE_MODULES:
+        importlib.import_module(module)
+    return registered_sources()
+
+"""
+Sink a source writes to in its own process, sending each workshop to the runner over conn
+"""
+class _PipeSink:
+    def __init__(self, conn):
+        self.conn = conn
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def write(self, workshop):
+        workshop = as_workshop(workshop)
+        with self._lock:
+            self.conn.send(('workshop', workshop))
+            self.count += 1
+
+"""
+Runs in a source's own process. Scrapes into the pipe, stopping at the
+deadline, then sends how the scrape ended with the items marked in this
+process's seen index, its metrics and its request timings for the runner
+to merge. The index is only read here, the runner commits it
+"""
+def _source_process(source_class, conn, seen_index_path, max_workers, timeout, logging_settings):
+    # A process group of its own, so _stop also reaches the source's worker processes
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    configure_worker_logging(*logging_settings)
+    seen_index = SeenIndex(seen_index_path) if seen_index_path else None
+    deadline = Deadline(timeout)
+    started = time.perf_counter()
+    error = None
+    try:
+        source_class().scrape(_PipeSink(conn), seen_index=seen_index, max_workers=max_workers, deadline=deadline)
+    except Exception as e:
+        log.debug("Full traceback:", exc_info=True)
+        error = str(e)
+    item_log = getattr(sys.modules.get(source_class.__module__), 'item_log', None)
+    if item_log is not None:
+        item_log.summary()
+    pending = seen_index.pending() if seen_index is not None else {}
+    if seen_index is not None:
+        seen_index.close()
+    conn.send(('done', error, deadline.expired(), time.perf_counter() - started,
+               pending, metrics.snapshot(), request_timings()))
+    conn.close()
+
+def _signal_group(process, signum):
+    try:
+        os.killpg(process.pid, signum)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+# Stops a source's process and every process it started
+def _stop(process):
+    if not hasattr(os, 'killpg'):
+        process.terminate()
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        return
+    _signal_group(process, signal.SIGTERM)
+    process.join(1)
+    _signal_group(process, signal.SIGKILL)
+    process.join()
+
+"""
+Scrapes every named source in parallel into one sink. The concurrency budget
+is split evenly between the sources, and each gets its own timeout
+Returns {source name: {'status', 'workshops', 'seconds'}}
+"""
+def run_sources(sink, names=None, seen_index=None, max_total_workers=MAX_TOTAL_WORKERS, timeout=None, engine="threads"):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    available = load_sources()
+    names = list(names) if names else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown sources {unknown}, expected some of {list(available)}")
+
+    sources = {name: available[name]() for name in names}
+    per_source_workers = max(1, max_total_workers // max(1, len(sources)))
+    source_sinks = {name: _SourceSink(name, sink) for name in names}
+    timeouts = {name: timeout or source.timeout for name, source in sources.items()}
+    if engine == "async":
+        import async_engine
+        results = async_engine.run_sources(sources, source_sinks, seen_index, per_source_workers, timeouts)
+    else:
+        results = run_in_processes(sources, source_sinks, seen_index, per_source_workers, timeouts)
+
+    for name, result in results.items():
+        log.info("%s: %s, %s workshops in %ss", name, result['status'], result['workshops'], result['seconds'])
+    return results
+
+"""
+Runs each source in a process of its own, writing the workshops it sends
+to its sink as they arrive. A source is told its timeout as a deadline to
+stop at, and its process is killed if it is still running STOP_GRACE
+seconds after that, so nothing it started outlives the run. The items each
+source marks in its own copy of the seen index are merged into seen_index
+Returns {source name: {'status', 'workshops', 'seconds'}}
+"""
+def run_in_processes(sources, source_sinks, seen_index, per_source_workers, timeouts):
+    # spawn, as forking copies this process's sqlite connections and held locks
+    context = multiprocessing.get_context("spawn")
+    seen_index_path = seen_index.path if seen_index is not None else None
+    logging_settings = worker_logging()
+    started = time.monotonic()
+    running = {}
+    results = {}
+
+    def finish(reader, status, seconds):
+        name, process, _ = running.pop(reader)
+        reader.close()
+        source_sinks[name].close()
+        results[name] = {'status': status, 'workshops': source_sinks[name].count, 'seconds': seconds}
+
+    try:
+        for name, source in sources.items():
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(target=_source_process, name=f"source-{name}",
+                                      args=(type(source), writer, seen_index_path, per_source_workers, timeouts[name], logging_settings))
+            process.start()
+            writer.close()
+            running[reader] = (name, process, started + timeouts[name] + STOP_GRACE)
+
+        while running:
+            for reader, (name, process, kill_at) in list(running.items()):
+                if time.monotonic() >= kill_at:
+                    _stop(process)
+                    log.warning("Source %s did not stop at its %ss timeout, killed it and kept the workshops it produced",
+                                name, timeouts[name])
+                    finish(reader, 'timeout', timeouts[name])
+            if not running:
+                break
+            next_kill = min(kill_at for _, _, kill_at in running.values())
+            for reader in wait(list(running), timeout=max(0, next_kill - time.monotonic())):
+                name, process, _ = running[reader]
+                try:
+                    message = reader.recv()
+                except EOFError:
+                    process.join()
+                    log.error("Source %s exited with code %s before finishing", name, process.exitcode)
+                    finish(reader, 'error', None)
+                    continue
+                if message[0] == 'workshop':
+                    source_sinks[name].write(message[1])
+                    continue
+
+                _, error, timed_out, seconds, pending, snapshot, timings = message
+                process.join()
+                metrics.merge(snapshot)
+                for timing in timings:
+                    record_timing(timing['url'], timing['status'], timing['seconds'], timing['bytes'])
+                if seen_index is not None:
+                    seen_index.mark(pending)
+                if error is not None:
+                    log.error("Source %s failed: %s", name, error)
+                    finish(reader, 'error', None)
+                elif timed_out:
+                    log.warning("Source %s timed out after %ss, keeping the workshops it produced", name, timeouts[name])
+                    finish(reader, 'timeout', timeouts[name])
+                else:
+                    finish(reader, 'ok', round(seconds, 3))
+    finally:
+        for name, process, _ in running.values():
+            _stop(process)
+    return results
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Scrape every workshop source in parallel into one output")
+    arg_parser.add_argument("--sources", nargs="+", metavar="NAME",
+                            help="sources to run, all registered sources by default")
+    arg_parser.add_argument("--max-workers", type=int, default=MAX_TOTAL_WORKERS,
+                            help="worker threads shared by all sources")
+    arg_parser.add_argument("--engine", choices=ENGINES, default="threads",
+                            help="run each source on worker threads in its own process, or all on one asyncio event loop (needs aiohttp)")
+    arg_parser.add_argument("--timeout", type=float,
+                            help="seconds after which each source stops, overriding the source's own timeout")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="skip items unchanged since the last run and save only new or changed workshops")
+    arg_parser.add_argument("--seen-index", default=DEFAULT_SEEN_INDEX_PATH,
+                            help="seen items index used by --incremental")
+    arg_parser.add_argument("--format", choices=FORMATS, default="ndjson",
+                            help="write one workshop per line (ndjson) or a single compact JSON array (json)")
+    arg_parser.add_argument("--db", metavar="PATH",
+                            help="upsert workshops into this SQLite database instead of writing a file")
+    arg_parser.add_argument("--report", metavar="PATH",
+                            help="write per-stage timings and item counters for the run to this JSON file")
+    arg_parser.add_argument("--prometheus", metavar="PATH",
+                            help="write the same metrics in Prometheus text format to this file")
+    arg_parser.add_argument("--dedup", action="store_true",
+                            help="merge the same event listed at several venues, re-titled or in several sources")
+    arg_parser.add_argument("--dedup-report", metavar="PATH",
+                            help="write the records merged by --dedup to this JSON file")
+    add_verbosity_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    configure_logging(args.verbose, args.quiet)
+
+    seen_index = SeenIndex(args.seen_index) if args.incremental else None
+    if args.db:
+        sink = WorkshopStore(args.db)
+    else:
+        prefix = "workshops_delta" if seen_index else "workshops"
+        sink = WorkshopSink(output_filename(f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}", args.format), format=args.format)
+    if args.dedup:
+        sink = DedupSink(sink)
+
+    try:
+        results = run_sources(sink, args.sources, seen_index, args.max_workers, args.timeout, args.engine)
+    except Exception as e:
+        log.error("Scrape run failed: %s", e)
+        sink.abort()
+        results = {}
+    saved = sink.close()
+
+    if args.dedup and args.dedup_report:
+        try:
+            with open(args.dedup_report, 'w', encoding='utf-8') as f:
+                json.dump(sink.report, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            log.error("Could not save de-duplication report %s: %s", args.dedup_report, e)
+
+    if seen_index is not None:
+        # A source that timed out or failed may have marked items it never
+        # wrote, so the index is only committed when every source finished
+        if saved and results and all(result['status'] == 'ok' for result in results.values()):
+            seen_index.commit()
+        seen_index.close()
+
+    log_timing_summary()
+    metrics.save(args.report, args.prometheus)
+    for module in SOURCE_MODULES:
+        item_log = getattr(sys.modules.get(module), 'item_log', None)
+        if item_log is not None:
+            item_log.summary()
+    return 0 if saved and results else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
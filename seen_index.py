@@ -0,0 +1,97 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import logging
+
+log = logging.getLogger("seen_index")
+
+DEFAULT_SEEN_INDEX_PATH = ".seen_items.sqlite"
+# Items missing from the feeds for this long are forgotten
+DEFAULT_MAX_AGE = 90 * 24 * 60 * 60
+
+"""
+Returns the key and content hash for an RSS item dict.
+The key is the item's guid, or its link, prefixed with the source; the hash
+covers every field of the item so any edit to the event counts as a change
+"""
+def item_identity(source, item):
+    key = item.get('guid') or item.get('link') or item.get('title', "")
+    content = json.dumps(item, sort_keys=True, ensure_ascii=False)
+    return f"{source}:{key.strip()}", hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+"""
+Persistent index of feed items already processed, for incremental runs.
+Lookups only see what earlier runs committed, so an item repeated within a
+run is handled as it would be without the index. Items marked during a run
+are written by commit(), once the run's output has been saved
+"""
+class SeenIndex:
+    def __init__(self, path=DEFAULT_SEEN_INDEX_PATH, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " key TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    """
+    Returns True if the item was processed by an earlier run and has not changed since.
+    Either way the item is marked as seen for this run
+    """
+    def is_unchanged(self, source, item):
+        key, content_hash = item_identity(source, item)
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM seen WHERE key = ?", (key,)).fetchone()
+            self._pending[key] = content_hash
+        return row is not None and row[0] == content_hash
+
+    """
+    Unmarks an item, so one that failed to process is retried next run
+    """
+    def discard(self, source, item):
+        key, _ = item_identity(source, item)
+        with self._lock:
+            self._pending.pop(key, None)
+
+    """
+    Returns the items marked this run, e.g. to send from a source's process to the index the runner commits
+    """
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    """
+    Marks the items returned by another index's pending()
+    """
+    def mark(self, pending):
+        with self._lock:
+            self._pending.update(pending)
+
+    """
+    Writes the items seen this run and forgets those not seen for max_age
+    """
+    def commit(self):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET content_hash = excluded.content_hash, last_seen = excluded.last_seen",
+                [(key, content_hash, now, now) for key, content_hash in self._pending.items()]
+            )
+            self._conn.execute("DELETE FROM seen WHERE last_seen < ?", (now - self.max_age,))
+            self._conn.commit()
+            log.info("Committed %s items to the seen index", len(self._pending))
+            self._pending = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,20 +1,39 @@
 import requests
+from http_cache import cached_get, cached_stream
+from http_client import log_timing_summary
+from rate_limiter import RateLimiter, parse_retry_after
+from price_cache import get_default_price_cache
+from price_extraction import (
+    DOLLAR_FALLBACK_PATTERN, associates_price_extractor, website_price_extractor, cost_field_price
+)
+from event_description import EventDescription, parse_event_description
+from date_parsing import find_month_day_year, find_time_range, as_datetime
+from keyword_matcher import KeywordClassifier
+from seen_index import SeenIndex, DEFAULT_SEEN_INDEX_PATH
+from workshop import Workshop
+from workshop_sink import WorkshopSink, FORMATS, output_filename
+from workshop_store import WorkshopStore
+from sources import Source, register_source
+from metrics import metrics
+from deadline import DeadlineExceeded, as_deadline
+from log_config import ItemLogger, add_verbosity_arguments, configure_logging, configure_worker_logging, worker_logging
+from rss_stream import iter_rss_items, item_fields, soup_item_fields
+from feed_planner import SHARD_SIZES, plan_shards, split_shard, shard_url, merge_shards
+from item_filters import (
+    run_filters, cancelled_filter, date_window_filter, location_filter, seen_filter,
+    category_date, trumba_places
+)
 from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import re
 import xml.etree.ElementTree as ET
-from dateutil import parser as date_parser
-import time
-from urllib.parse import urljoin, urlparse
-from datetime import datetime
 import logging
-import json
-import traceback
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, CancelledError, TimeoutError as FutureTimeout
 
-logging.basicConfig(level=logging.NOTSET)
-logging.getLogger('chardet.charsetprober').setLevel(logging.INFO)
-logging.getLogger("bs4.dammit").setLevel(logging.ERROR)
 log = logging.getLogger("smithsonian_sraper")
+item_log = ItemLogger(log)
 
 smithsonian_locations = [
     'national air and space museum',
@@ -39,7 +58,7 @@ smithsonian_locations = [
 
 kid_friendly_keywords = [
     'kids', 'children', 'child', 'family', 'families', 'toddler', 'preschool',
-    'elementary', 'youth', 'teen', 'teenager', 'ages', 'grade', 'young',
+    'elementary', 'youth', 'teen', 'teens', 'teenager', 'ages', 'grade', 'young',
     'workshop for kids', 'family program', 'baby', 'babies','junior',
     'art activities', 'all ages', 'early learners', 'storybook'
 ]
@@ -52,45 +71,52 @@ age_patterns = [
     r'\bgrades?\s*([K\d]+)(?:\s*[-–]\s*(\d+))?\b'
 ]
 
-gen_admission_patterns = [
-    r'\$(\d+(?:\.\d{2})?)\s*(?:\n|\s)+gen\.?\s*admission',
-    r'\$(\d+(?:\.\d{2})?)\s*(?:\n|\s)+general\s*admission',
-    r'gen\.?\s*admission\s*(?:\n|\s)*\$(\d+(?:\.\d{2})?)',
-    r'general\s*admission\s*(?:\n|\s)*\$(\d+(?:\.\d{2})?)',
-    r'gen\.?\s*admission[:\s]*\$(\d+(?:\.\d{2})?)',
-    r'general\s*admission[:\s]*\$(\d+(?:\.\d{2})?)',
-]
-
 # Check for virtual event indicators first
 virtual_indicators = [
     'virtual', 'online', 'zoom', 'webinar', 'livestream', 'live stream',
     'digital', 'remote', 'via zoom', 'online event', 'virtual event',
     'from home', 'participate online', 'join online', 'web-based'
 ]
-price_patterns = [
-    (r'\b(free admission|free entry|no admission fee|admission is free|entry is free|free of charge)\b', 'Free'),
-    (r'\b(free\s+event|this\s+event\s+is\s+free|no\s+charge)\b', 'Free'),
-    (r'\b(complimentary|free)\b(?![a-z])', 'Free'),
-    (r'non[\-\s]*member[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'registration[\s\-]*gen\.?\s*admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'museum\s+admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'adults?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'admission[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'cost[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'price[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'fee[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'ticket[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'(?:admission|cost|price|fee|ticket).*?\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'\$(\d+(?:\.\d{2})?).*?(?:admission|cost|price|fee|ticket)', lambda m: f"${m.group(1)}"),
-    (r'admission.*?\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-    (r'\$(\d+(?:\.\d{2})?).*?admission', lambda m: f"${m.group(1)}"),
-    (r'included\s+with\s+museum\s+admission', 'Included with museum admission'),
-    (r'included\s+with\s+admission', 'Included with museum admission'),
-    (r'with\s+paid\s+museum\s+admission', 'Included with museum admission'),
-    (r'no\s+additional\s+cost', 'Included with museum admission'),
-    (r'\$(\d+(?:\.\d{2})?)\s*(?:per\s+person|each|adult)', lambda m: f"${m.group(1)}"),
-    (r'member[s]?[:\s]*\$(\d+(?:\.\d{2})?)', lambda m: f"${m.group(1)}"),
-]
+
+event_classifier = KeywordClassifier({
+    'kid_friendly': kid_friendly_keywords,
+    'virtual': virtual_indicators,
+})
+
+# Per-domain throttling for the price page scrapers
+PRICE_REQUESTS_PER_SECOND = 1 / 1.5
+PRICE_BURST = 2
+MAX_FETCH_ATTEMPTS = 3
+MAX_RETRY_AFTER = 60
+PRICE_FETCH_WORKERS = 8
+# Seconds before a feed or price page request times out, or sooner when less of a deadline is left
+REQUEST_TIMEOUT = 20
+
+SOURCE_NAME = "smithsonian"
+RSS_URL = "https://www.trumba.com/calendars/smithsonian-events.rss?filter1=_16658_&filterfield1=11153"
+
+# Parse the feed incrementally as it downloads instead of building the whole XML tree
+STREAM_RSS = True
+# Worker processes parsing feed items, 0 or 1 parses them in this process.
+# Worth it for multi-month exports, where item parsing outweighs starting the pool
+PARSE_WORKERS = 0
+# Items sent to a worker process at a time
+PARSE_CHUNK_SIZE = 200
+
+# Days ahead requested from Trumba, split into week or month shards fetched in
+# parallel. 0 makes one request for the feed's own default window
+HORIZON_DAYS = 180
+SHARD_SIZE = "month"
+SHARD_FETCH_WORKERS = 4
+# Trumba caps the events in one feed, a shard returning this many is split and fetched again
+SHARD_ITEM_LIMIT = 1000
+price_rate_limiter = RateLimiter(PRICE_REQUESTS_PER_SECOND, PRICE_BURST)
+PRICE_PAGE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+}
+RSS_HEADERS = {
+    'Accept': 'application/rss+xml, application/xml, text/xml, */*'
+}
 
 
 """
@@ -106,20 +132,12 @@ def extract_event_date(item_category, description):
                 return datetime(int(year), int(month), int(day)) 
 
         if description:
-            first_line = description.split("<br")[0]
-            text = BeautifulSoup(first_line, "html.parser").get_text(" ", strip=True)
-
-            date_match = re.search(
-                r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}",
-                text
-            )
-            if date_match:
-                date_str = date_match.group(0)
-                dt = datetime(date_str, "%B %d, %Y")
-                return dt
+            event_date = find_month_day_year(parse_event_description(description).date_line)
+            if event_date:
+                return as_datetime(event_date)
 
     except Exception as e:
-        log.warning(f"Error extracting date: {e}")
+        log.warning("Error extracting date: %s", e)
     
     return None
 
@@ -130,29 +148,19 @@ Cleans up an event description pulled from the Smithsonian Events RSS feed.
 - Strips HTML tags
 """
 def clean_event_description(description):
-    parts = re.split(r"<br/><br/>", description)
-    if len(parts) >= 2:
-        desc = parts[1]
-    else:
-        desc = parts[0]
-
-    soup = BeautifulSoup(desc, "html.parser")
-    desc = soup.get_text(" ", strip=True).replace('\xa0', ' ')
-    return desc
+    return parse_event_description(description).body
 
 """
-Extracts cost from <description>.
+Extracts cost from <description>, preferring the General Admission or non-member price.
 Returns 0 if its a free event, or the cost as a string
 """
 def get_cost(description):
-    pattern = r'<b>Cost</b>:&nbsp;([^<]+)'
-    match = re.search(pattern, description)
-    if match:
-        cost_split = re.split(r'[|;,./]', match[0])
-        if len(cost_split)> 2:
-            cost = cost_split[2]
-            return cost.replace('$', '')
-    if description.find("Free") != -1 or description.find("free") != -1:
+    description = parse_event_description(description)
+    if description.cost:
+        price = cost_field_price(description.cost)
+        if price is not None:
+            return price
+    if description.text.find("Free") != -1 or description.text.find("free") != -1:
         return 0
     return None
 
@@ -166,38 +174,14 @@ def extract_event_times(description):
         return None, None
 
     try:
-        first_line = description.split("<br")[0]
-        text = BeautifulSoup(first_line, "html.parser").get_text(" ", strip=True)
-
-        time_match = re.search(
-            r"(\d{1,2}(?::\d{2})?)\s*(am|pm)?\s*[–-]\s*(\d{1,2}(?::\d{2})?)\s*(am|pm)",
-            text,
-            re.I
-        )
-
-        if not time_match:
+        start, end = find_time_range(parse_event_description(description).date_line)
+        if start is None:
             return None, None
 
-        start_raw, start_meridiem, end_raw, end_meridiem = time_match.groups()
-        if not start_meridiem:
-            start_meridiem = end_meridiem
-        start_time_str = f"{start_raw} {start_meridiem.lower()}"
-        end_time_str = f"{end_raw} {end_meridiem.lower()}"
-
-        start_dt = datetime.strptime(start_time_str, "%I:%M %p") if ":" in start_raw else datetime.strptime(start_time_str, "%I %p")
-        end_dt = datetime.strptime(end_time_str, "%I:%M %p") if ":" in end_raw else datetime.strptime(end_time_str, "%I %p")
-
-        start_sql = start_dt.strftime("%H:%M:%S")
-        end_sql = end_dt.strftime("%H:%M:%S")
-
-        return start_sql, end_sql
-
-    except Exception as e:
-        log.warning(f"Error extracting event times: {e}")
-        return None, None
+        return start.strftime("%H:%M:%S"), end.strftime("%H:%M:%S")
 
     except Exception as e:
-        log.warning(f"Error extracting event times: {e}")
+        log.warning("Error extracting event times: %s", e)
         return None, None
 
 """
@@ -219,126 +203,169 @@ def extract_price_link_from_description(description):
         return match.group(1).replace('$', '')
     return ""
 
+"""
+Fetches a page under the per-domain rate limit, waiting out Retry-After on 429/503
+Raises DeadlineExceeded if deadline expires before the page is fetched
+Returns the response
+"""
+def fetch_rate_limited(url, headers, timeout=REQUEST_TIMEOUT, deadline=None):
+    deadline = as_deadline(deadline)
+    for attempt in range(MAX_FETCH_ATTEMPTS):
+        price_rate_limiter.acquire(url, deadline)
+        response = cached_get(url, headers=headers, timeout=deadline.timeout(timeout), allow_redirects=True)
+        metrics.count_response(response, SOURCE_NAME)
+        delay = retry_delay(response)
+        if delay is None:
+            return response
+        price_rate_limiter.defer(url, delay)
+    return response
+
+"""
+Decides whether a price page response is retried, shared by the threaded
+and async fetches: only a 429 or 503 whose Retry-After is at most MAX_RETRY_AFTER is
+Returns the seconds to hold back the host before retrying, or None to use the response
+"""
+def retry_delay(response):
+    if response.status_code not in (429, 503):
+        return None
+    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    if retry_after is None or retry_after > MAX_RETRY_AFTER:
+        return None
+    log.info("Got %s, retrying after %.1fs", response.status_code, retry_after)
+    return retry_after
+
+"""
+Returns the price cached for a price page, "" when the page had none, or None when it is not cached
+"""
+def cached_price(url):
+    cached = get_default_price_cache().lookup(url)
+    if cached is None:
+        return None
+    item_log.debug("Using cached price for: %s", url[:60])
+    return cached[0] or ""
+
+def is_associates_page(url):
+    return bool(url) and 'smithsonianassociates.org/ticketing' in url
+
+def is_event_page(url):
+    return bool(url) and 'eventbrite' not in url.lower()
+
+"""
+Finds the price in the lowercased text of a Smithsonian Associates ticketing page
+Returns a tuple of the string price ("" if none) and the pattern that matched
+"""
+def find_associates_price(page_text):
+    price, pattern, label = associates_price_extractor.extract(page_text)
+    if price is None:
+        item_log.debug("No price found on Smithsonian Associates page")
+        return "", None
+    if label == "General Admission":
+        item_log.debug("Found General Admission price: $%s", price)
+    elif pattern == DOLLAR_FALLBACK_PATTERN:
+        item_log.debug("Found potential Smithsonian Associates price:$%s", price)
+    else:
+        item_log.debug("Found Smithsonian Associates price: %s", price)
+    return price, pattern
+
+"""
+Finds the price in a downloaded Smithsonian Associates ticketing page
+Returns a tuple of the string price ("" if none) and the pattern that matched
+"""
+def parse_associates_page(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return find_associates_price(soup.get_text(separator=' ', strip=True).lower())
+
 """
 Scrapes event price from the link
 Returns the string price
 """
-def scrape_smithsonian_associates_price(url):
-    if not url or 'smithsonianassociates.org/ticketing' not in url:
+def scrape_smithsonian_associates_price(url, deadline=None):
+    if not is_associates_page(url):
         return ""
+
+    cached = cached_price(url)
+    if cached is not None:
+        return cached
     
     try:
-        print(f"Scraping Smithsonian Associates price: {url[:60]}...")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br'
-        }
+        item_log.debug("Scraping Smithsonian Associates price: %s...", url[:60])
         
-        response = requests.get(url, headers=headers, timeout=20, allow_redirects=True)
+        response = fetch_rate_limited(url, PRICE_PAGE_HEADERS, deadline=deadline)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        page_text = soup.get_text(separator=' ', strip=True).lower()
-        
-        for pattern in gen_admission_patterns:
-            match = re.search(pattern, page_text, re.I)
-            if match:
-                price = f"${match.group(1)}"
-                log.info(f"Found General Admission price: {price}")
-                return price.replace('$', '')
-        
-        for pattern, result in price_patterns:
-            match = re.search(pattern, page_text, re.I)
-            if match:
-                if callable(result):
-                    price = result(match)
-                else:
-                    price = result
-                log.info(f"Found Smithsonian Associates price: {price}")
-                return price.replace('$', '')
-        
-        # Fallback: look for any dollar amounts on the page
-        dollar_matches = re.findall(r'\$(\d+(?:\.\d{2})?)', page_text)
-        if dollar_matches:
-            # Filter reasonable event prices
-            reasonable_prices = [float(p) for p in dollar_matches if 5 <= float(p) <= 200]
-            if reasonable_prices:
-                # Take the first reasonable price found
-                price_val = reasonable_prices[0]
-                price = f"${price_val:.0f}" if price_val == int(price_val) else f"${price_val}"
-                log.info(f'Found potential Smithsonian Associates price:{price}')
-                return price.replace('$', '')
-        
-        log.info(f"No price found on Smithsonian Associates page")
-        return ""
+        price, pattern = parse_associates_page(response.content)
+        get_default_price_cache().store(url, price, pattern)
+        return price
         
+    except DeadlineExceeded:
+        raise
     except requests.exceptions.RequestException as e:
-        log.warning(f"Error fetching Smithsonian Associates page: {e}")
+        log.warning("Error fetching Smithsonian Associates page: %s", e)
         return ""
     except Exception as e:
-        log.warning(f"Error parsing Smithsonian Associates page: {e}")
+        log.warning("Error parsing Smithsonian Associates page: %s", e)
         return ""
-    finally:
-        time.sleep(1.5)
+
+"""
+Finds the price in the text of an event webpage
+Returns a tuple of the string price (None if none) and the pattern that matched
+"""
+def find_website_price(page_text):
+    price, pattern, label = website_price_extractor.extract(page_text)
+    if price is None:
+        item_log.debug("No price found on website")
+        return None, None
+    if pattern == DOLLAR_FALLBACK_PATTERN:
+        item_log.debug("Found potential price: $%s", price)
+    else:
+        item_log.debug("Found price: %s", price)
+    return price, pattern
+
+"""
+Finds the price in a downloaded event webpage
+Returns a tuple of the string price (None if none) and the pattern that matched
+"""
+def parse_website_page(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return find_website_price(soup.get_text(separator=' ', strip=True))
+
 """
 Scrapes event price from the smithsonian webpage link
 Returns the string price
 """
-def scrape_website_for_price(url):
-    if not url or 'eventbrite' in url.lower():
+def scrape_website_for_price(url, deadline=None):
+    if not is_event_page(url):
         return ""
+
+    cached = cached_price(url)
+    if cached is not None:
+        return cached
     
     try:
-        log.info('Checking website for price: {}...'.format(url[:60]))
+        item_log.debug("Checking website for price: %s...", url[:60])
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=20, allow_redirects=True)
+        response = fetch_rate_limited(url, PRICE_PAGE_HEADERS, deadline=deadline)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        page_text = soup.get_text(separator=' ', strip=True)
-        page_text_lower = page_text.lower()
 
-        for pattern, result in price_patterns:
-            match = re.search(pattern, page_text_lower, re.I)
-            if match:
-                if callable(result):
-                    price = result(match)
-                else:
-                    price = result
-                
-                log.info(f"Found price: {price}")
-                return price.replace('$', '')
-        
-        dollar_matches = re.findall(r'\$(\d+(?:\.\d{2})?)', page_text)
-        if dollar_matches:
-            reasonable_prices = [float(p) for p in dollar_matches if 5 <= float(p) <= 100]
-            if reasonable_prices:
-                price = f"${reasonable_prices[0]:.0f}" if reasonable_prices[0] == int(reasonable_prices[0]) else f"${reasonable_prices[0]}"
-                log.info(f"Found potential price: {price}")
-                return price.replace('$', '')
-        
-        log.info(f"No price found on website")
-        return None
+        price, pattern = parse_website_page(response.content)
+        get_default_price_cache().store(url, price, pattern)
+        return price
         
+    except DeadlineExceeded:
+        raise
     except requests.exceptions.RequestException as e:
-        log.warning(f"Error fetching website: {e}")
+        log.warning("Error fetching website: %s", e)
         return ""
     except Exception as e:
-        log.warning(f"Error parsing website: {e}")
+        log.warning("Error parsing website: %s", e)
         return ""
-    finally:
-        time.sleep(1.5)
+
+# Price page scrapers queued by parse_smithsonian_item, with the urls they
+# accept and the parser for a downloaded page, for fetching the pages elsewhere
+PRICE_PAGES = {
+    scrape_smithsonian_associates_price: (is_associates_page, parse_associates_page),
+    scrape_website_for_price: (is_event_page, parse_website_page),
+}
 
 """
 Extract only Venue and Event Location from the Smithsonian RSS description HTML.
@@ -349,16 +376,10 @@ def extract_venue_and_location_from_rss(description):
         return ""
 
     try:
-        soup = BeautifulSoup(description, "html.parser")
-        text = soup.get_text(" ", strip=True)
-
-        sponsor_match = re.search(r"Sponsor\s*:\s*([^\n\r]+?)(?=\s*(Event Location|Cost|Categories|$))", text, re.I)
-        sponsor = sponsor_match.group(1).replace('\xa0', ' ').strip() if sponsor_match else ""
-        venue_match = re.search(r"Venue\s*:\s*([^\n\r]+?)(?=\s*(Event Location|Cost|Categories|$))", text, re.I)
-        loc_match = re.search(r"Event Location\s*:\s*([^\n\r]+?)(?=\s*(Venue|Cost|Categories|$))", text, re.I)
-
-        venue = venue_match.group(1).replace('\xa0', ' ').strip() if venue_match else ""
-        event_location = loc_match.group(1).replace('\xa0', ' ').strip() if loc_match else ""
+        description = parse_event_description(description)
+        sponsor = description.sponsor
+        venue = description.venue
+        event_location = description.event_location
         
         if sponsor != "" and sponsor == "Ana":
             sponsor = "Anacostia Community Museum"
@@ -377,7 +398,7 @@ def extract_venue_and_location_from_rss(description):
             return (None, None)
 
     except Exception as e:
-        log.warning(f"Error extracting venue/location: {e}")
+        log.warning("Error extracting venue/location: %s", e)
         return ""
 """
 Determines if an event is virtual
@@ -386,30 +407,32 @@ Returns a boolean
 def is_virtual(text, title=""):
     if not text:
         return ""
+    if isinstance(text, EventDescription):
+        text = text.html
     
-    combined_text = f"{title} {text}".lower()
-    
-    for indicator in virtual_indicators:
-        if indicator in combined_text:
-            return True
-    return False
+    return bool(event_classifier.match(f"{title} {text}")['virtual'])
+
+"""
+Matches the kid friendly and virtual keywords against an event in one pass
+Returns a dict of keyword set name to the keywords found
+"""
+def classify_event(description, title=""):
+    description = parse_event_description(description)
+    return event_classifier.match(f"{title} {description.html} {description.categories} {description.audience}")
 
 """
 Determines if an event is kid friendly
 Returns a boolean
 """
-def is_kid_friendly_event(description):
-    categories_match = re.search(r'<b>Categories</b>:&nbsp;([^<]+)', description)
-    categories = categories_match.group(1) if categories_match else ""
-    
-    audience_match = re.search(r'Recommended Audience:(?:&nbsp;|\s)*([^<\n]+)', description)
-    recommended_audience = audience_match.group(1) if audience_match else ""
-
-    all_text = f"{description} {categories} {recommended_audience}".lower()
+def is_kid_friendly_event(description, keyword_matches=None):
+    description = parse_event_description(description)
+    if keyword_matches is None:
+        keyword_matches = classify_event(description)
 
-    if any(keyword in categories.lower() for keyword in kid_friendly_keywords):
+    if keyword_matches['kid_friendly']:
         return True
     
+    recommended_audience = description.audience
     if recommended_audience:
         for pattern in age_patterns:
             matches = re.findall(pattern, recommended_audience.lower())
@@ -420,172 +443,584 @@ def is_kid_friendly_event(description):
                         if ages and any(age <= 17 for age in ages):
                             return True
     
-    matched_keywords = [keyword for keyword in kid_friendly_keywords if keyword in all_text]
-    if matched_keywords:
-        return True
-    
     return False
 
 """
-Extracts and builds the workshop data dictionary for all items found in the RSS feed
-Returns list of workshop dictionaries
+Runs the queued (scraper, url) price lookups on a worker pool, each distinct one once.
+Lookups not finished when deadline expires are left out, and the ones in
+flight give up with it
+Returns a dict of price by (scraper, url)
 """
-def scrape_smithsonian_rss():
-    rss_url = "https://www.trumba.com/calendars/smithsonian-events.rss?filter1=_16658_&filterfield1=11153"
-    scraped_at = datetime.now().isoformat()
-    workshops = []
+def resolve_prices(price_jobs, max_workers=PRICE_FETCH_WORKERS, deadline=None):
+    unique_jobs = list(dict.fromkeys(price_jobs))
+    if not unique_jobs:
+        return {}
+
+    deadline = as_deadline(deadline)
+    log.info("Resolving %s price pages", len(unique_jobs))
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = {job: executor.submit(job[0], job[1], deadline) for job in unique_jobs}
+    done, not_done = wait(futures.values(), timeout=deadline.remaining())
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    prices = {}
+    dropped = len(not_done)
+    for job, future in futures.items():
+        if future not in done:
+            continue
+        try:
+            prices[job] = future.result()
+        except DeadlineExceeded:
+            dropped += 1
+        except Exception as e:
+            log.warning("Error scraping price from %s: %s", job[1], e)
+    if dropped:
+        log.warning("Deadline of %ss reached, %s price pages left unresolved", deadline.seconds, dropped)
+    return prices
+
+"""
+Builds the Workshop for one RSS item, queuing a price page lookup if needed
+Returns a (Workshop, price_job) tuple, or None if the item is skipped
+"""
+def parse_smithsonian_item(item, rss_url, scraped_at):
+    if 'title' not in item:
+        log.warning("Error parsing item in feed, skipping")
+        metrics.count("items_skipped", SOURCE_NAME, reason="no_title")
+        return None
+    title = item.get('title', "")
+    description = item.get('description', "")
+    link = item.get('link', "")
+    category = item.get('category', "")
+
+    #TODO: Update to include cancelled events in seperate JSON
+    if title.find("CANCELLED") != -1:
+        item_log.debug("Event cancelled, skipping")
+        metrics.count("items_skipped", SOURCE_NAME, reason="cancelled")
+        return None
+    
+    item_log.debug("Title: %s", title[:60])
+
+    original_description = description
+    # Tokenized once here, every extractor below reads from it
+    with metrics.stage("html_parse", SOURCE_NAME):
+        parsed_description = parse_event_description(description)
+
+    with metrics.stage("date_extraction", SOURCE_NAME):
+        event_date = extract_event_date(category, parsed_description)
+    if event_date:
+        if event_date < datetime.today():
+            item_log.debug("Skipping past event: %s", event_date.date())
+            metrics.count("items_skipped", SOURCE_NAME, reason="past")
+            return None
+    else:
+        item_log.debug("Could not parse date, including anyway")
+
+    with metrics.stage("date_extraction", SOURCE_NAME):
+        time = extract_event_times(parsed_description)
+    found_price  = get_cost(parsed_description)
+    keyword_matches = classify_event(parsed_description)
+    kid_friendly = is_kid_friendly_event(parsed_description, keyword_matches)
+    cleaned_description = clean_event_description(parsed_description)
+    event_url = link.strip() if link else rss_url
+
+    virtual = bool(keyword_matches['virtual'])
+    item_log.debug("Matched keywords: %s", keyword_matches)
+    if not virtual:
+        location = extract_venue_and_location_from_rss(parsed_description)
+    else:
+        location = ("Virtual", "Virutal")
+    
+    price = None
+    if found_price is not None:
+        price = found_price
     
+    # Price pages are fetched in the second phase, once every item is parsed
+    price_job = None
+    if price is None:
+        pricing_link = extract_price_link_from_description(original_description)
+        if pricing_link:
+            item_log.debug("Found Smithsonian Associates pricing link")
+            price_job = (scrape_smithsonian_associates_price, pricing_link)
+        elif not price or "check website" in price.lower():
+            item_log.debug("No pricing link found")
+            event_url = link.strip() if link else ""
+            if event_url and 'eventbrite' not in event_url.lower():
+                item_log.debug("Queueing price scrape from: %s", event_url)
+                price_job = (scrape_website_for_price, event_url)
+    
+    # price stays the scraped string until emit_workshops fills in price pages and converts it
+    workshop_data = Workshop(
+        url=event_url.strip(),
+        scraped_at=scraped_at,
+        title=title.strip(),
+        description=cleaned_description.strip() if cleaned_description else title.strip(),
+        date=event_date.strftime("%Y-%m-%d"),
+        time=time[0],
+        end_time=time[1],
+        price=price,
+        location=location[1].strip(),
+        venue=location[0].strip(),
+        kidfriendly=kid_friendly,
+        submittedBy="scraper_smithsonian",
+        business="Smithsonian",
+        source=SOURCE_NAME,
+    )
+
+    return workshop_data, price_job
+
+"""
+Fetches the Smithsonian RSS feed
+Returns an iterable of item dicts, streamed as the feed downloads when stream is set
+"""
+def fetch_smithsonian_items(rss_url, stream=STREAM_RSS, deadline=None):
+    headers = RSS_HEADERS
+    deadline = as_deadline(deadline)
+    if stream:
+        body = cached_stream(rss_url, headers=headers, timeout=deadline.timeout(REQUEST_TIMEOUT))
+        chunks = metrics.download(deadline.guard(body), SOURCE_NAME)
+        return metrics.timed_iter(iter_rss_items(chunks), "xml_parse", SOURCE_NAME)
+
+    with metrics.stage("fetch", SOURCE_NAME):
+        response = cached_get(rss_url, headers=headers, timeout=deadline.timeout(REQUEST_TIMEOUT))
+    response.raise_for_status()
+    metrics.count_response(response, SOURCE_NAME)
+    
+    log.info("RSS feed fetched successfully: %s bytes", len(response.content))
+
+    with metrics.stage("xml_parse", SOURCE_NAME):
+        items = _parse_feed(response)
+    log.info("Found %s items in RSS feed", len(items))
+    return items
+
+"""
+Fetches the items of one date window shard, splitting the shard in half and
+fetching both halves when the feed comes back truncated
+Returns list of item dicts
+"""
+def fetch_shard_items(shard, stream=STREAM_RSS, deadline=None):
+    rss_url = shard_url(RSS_URL, shard)
     try:
-        log.info(f"Fetching Smithsonian RSS feed...")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/rss+xml, application/xml, text/xml, */*'
-        }
-        
-        response = requests.get(rss_url, headers=headers, timeout=20)
-        response.raise_for_status()
-        
-        log.info(f"RSS feed fetched successfully: {len(response.content)} bytes")
+        items = list(fetch_smithsonian_items(rss_url, stream, deadline))
+    except ET.ParseError as e:
+        if not stream:
+            raise
+        log.warning("Streaming RSS parse failed, parsing the full feed instead: %s", e)
+        items = list(fetch_smithsonian_items(rss_url, False, deadline))
+
+    halves = truncated_shard_halves(shard, items)
+    if halves:
+        return [item for half in halves for item in fetch_shard_items(half, stream, deadline)]
+    return items
+
+"""
+Returns the two halves to fetch instead when a shard's feed came back
+truncated, or None to keep its items
+"""
+def truncated_shard_halves(shard, items):
+    if len(items) < SHARD_ITEM_LIMIT:
+        return None
+    halves = split_shard(shard)
+    if halves:
+        log.warning("Shard from %s (%s days) returned %s items, splitting it", shard[0], shard[1], len(items))
+    return halves
+
+"""
+Plans the date window shards of the next horizon_days
+Returns list of (first day, number of days) tuples in date order
+"""
+def plan_feed_shards(horizon_days, shard_size):
+    shards = plan_shards(date.today(), horizon_days, shard_size)
+    log.info("Fetching the next %s days as %s %s shards", horizon_days, len(shards), shard_size)
+    return shards
 
+"""
+Checks one shard's fetch result, its items or the exception fetching it raised
+Returns the items, or None for a shard that failed and is left out
+"""
+def shard_result(shard, result):
+    if isinstance(result, Exception):
+        log.warning("Error fetching shard from %s (%s days): %s", shard[0], shard[1], result)
+        return None
+    log.info("Shard from %s: %s items", shard[0], len(result))
+    return result
+
+"""
+Fetches only the future date window, as shards in parallel, merged in date
+order with events listed by more than one shard dropped. A shard that fails
+is logged and left out, and shards not in when deadline expires are dropped
+Returns an iterable of item dicts, yielding each shard's items as soon as it and the ones before it are in
+"""
+def fetch_sharded_items(horizon_days=HORIZON_DAYS, shard_size=SHARD_SIZE, stream=STREAM_RSS, max_workers=SHARD_FETCH_WORKERS,
+                        deadline=None):
+    deadline = as_deadline(deadline)
+    shards = plan_feed_shards(horizon_days, shard_size)
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = [executor.submit(fetch_shard_items, shard, stream, deadline) for shard in shards]
+
+    def shard_results():
+        try:
+            for shard, future in zip(shards, futures):
+                try:
+                    result = future.result(timeout=deadline.remaining())
+                except (FutureTimeout, DeadlineExceeded):
+                    log.warning("Deadline of %ss reached, dropping shards from %s", deadline.seconds, shard[0])
+                    return
+                except Exception as e:
+                    result = e
+                items = shard_result(shard, result)
+                if items is not None:
+                    yield items
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return merge_shards(shard_results())
+
+"""
+Parses a fully downloaded feed, falling back from XML to ElementTree to the HTML parser
+Returns list of item dicts
+"""
+def _parse_feed(response):
+    try:
+        soup = BeautifulSoup(response.content, 'xml')
+        items = [soup_item_fields(item) for item in soup.find_all('item')]
+    except Exception as e:
+        log.warning("BeautifulSoup XML parsing failed: %s", e)
         try:
-            soup = BeautifulSoup(response.content, 'xml')
-            items = soup.find_all('item')
+            root = ET.fromstring(response.content)
+            items = [item_fields(item) for item in root.findall('.//item')]
+            log.info("Parsed with ElementTree")
+        except ET.ParseError as e:
+            log.warning("ElementTree parsing failed: %s", e)
+            soup = BeautifulSoup(response.content, 'html.parser')
+            items = [soup_item_fields(item) for item in soup.find_all('item')]
+    return items
+
+"""
+Cheap checks run on each raw feed item before it is parsed: cancelled, dated
+before today or beyond the horizon, at none of the wanted venues, and last
+unchanged since the previous run
+Returns the filters for item_filters.run_filters
+"""
+def smithsonian_filters(seen_index=None, horizon_days=None, venues=None):
+    today = date.today()
+    end = today + timedelta(days=horizon_days) if horizon_days else None
+    filters = [cancelled_filter(), date_window_filter(category_date, today, end)]
+    if venues:
+        filters.append(location_filter(trumba_places, venues))
+    if seen_index is not None:
+        filters.append(seen_filter(seen_index, SOURCE_NAME))
+    return filters
+
+"""
+Yields items until deadline expires or reading them raises DeadlineExceeded,
+so the items read by then are still parsed and written
+"""
+def _until(items, deadline):
+    try:
+        for item in items:
+            if deadline.expired():
+                break
+            yield item
+    except DeadlineExceeded:
+        pass
+    if deadline.expired():
+        log.warning("Deadline of %ss reached, keeping the items read so far", deadline.seconds)
+
+"""
+Parses the items read from the feed so far, in item order. With more than
+one parse worker they go in chunks to a process pool, see _parse_items_parallel.
+Reading stops when deadline expires
+Returns list of (item number, workshop_data, price_job) tuples
+"""
+def _parse_items(items, rss_url, scraped_at, seen_index=None, workers=PARSE_WORKERS, chunk_size=PARSE_CHUNK_SIZE, filters=None,
+                 deadline=None):
+    if filters is None:
+        filters = smithsonian_filters(seen_index)
+    deadline = as_deadline(deadline)
+    items = _until(items, deadline)
+    if workers and workers > 1:
+        return _parse_items_parallel(items, rss_url, scraped_at, seen_index, workers, chunk_size, filters, deadline)
+    parsed = []
+    for i, item in enumerate(items, 1):
+        try:
+            item_log.debug("Processing item %s", i)
+            metrics.count("items_seen", SOURCE_NAME)
+            reason = run_filters(filters, item)
+            if reason:
+                item_log.debug("Skipping item: %s", reason)
+                metrics.count("items_skipped", SOURCE_NAME, reason=reason)
+                continue
+            result = parse_smithsonian_item(item, rss_url, scraped_at)
+            if result:
+                parsed.append((i,) + result)
         except Exception as e:
-            print(f"BeautifulSoup XML parsing failed: {e}")
-            try:
-                root = ET.fromstring(response.content)
-                items = root.findall('.//item')
-                print(f"Parsed with ElementTree")
-            except ET.ParseError as e:
-                print(f"ElementTree parsing failed: {e}")
-                soup = BeautifulSoup(response.content, 'html.parser')
-                items = soup.find_all('item')
-        
-        log.info(f"Found {len(items)} items in RSS feed")
-        
-        current_date = datetime.now()
+            log.warning("Error processing item %s: %s", i, e)
+            metrics.count("items_skipped", SOURCE_NAME, reason="error")
+            if seen_index is not None:
+                seen_index.discard(SOURCE_NAME, item)
+            continue
+    return parsed
+
+def _init_parse_worker(settings, level):
+    configure_worker_logging(settings, level)
+
+"""
+Runs in a worker process: parses a chunk of (item number, item dict) pairs
+Returns the (item number, result, error) triples in chunk order, with the
+worker's metrics for the chunk
+"""
+def _parse_chunk(chunk, rss_url, scraped_at):
+    metrics.reset()
+    results = []
+    for i, item in chunk:
+        try:
+            results.append((i, parse_smithsonian_item(item, rss_url, scraped_at), None))
+        except Exception as e:
+            results.append((i, None, str(e)))
+    return results, metrics.snapshot()
 
+"""
+Parses items in chunks on a pool of worker processes, so item parsing uses
+every core instead of one. Chunks are sent as soon as the feed has produced
+them and the results are read back in submission order, so item order is
+kept. The seen index stays in this process. Chunks not parsed when deadline
+expires are cancelled and unmarked in the seen index, only the ones already
+running are waited for
+"""
+def _parse_items_parallel(items, rss_url, scraped_at, seen_index, workers, chunk_size, filters, deadline=None):
+    deadline = as_deadline(deadline)
+    chunk_size = max(1, chunk_size)
+    submitted = []
+    parsed = []
+    # spawn, as forking copies this process's sqlite connections and held locks
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_parse_worker, initargs=worker_logging()) as executor:
+        chunk = []
         for i, item in enumerate(items, 1):
+            metrics.count("items_seen", SOURCE_NAME)
+            reason = run_filters(filters, item)
+            if reason:
+                metrics.count("items_skipped", SOURCE_NAME, reason=reason)
+                continue
+            chunk.append((i, item))
+            if len(chunk) >= chunk_size:
+                submitted.append((chunk, executor.submit(_parse_chunk, chunk, rss_url, scraped_at)))
+                chunk = []
+        if chunk:
+            submitted.append((chunk, executor.submit(_parse_chunk, chunk, rss_url, scraped_at)))
+        log.info("Parsing %s items in %s chunks on %s worker processes",
+                 sum(len(chunk) for chunk, _ in submitted), len(submitted), workers)
+
+        expired = False
+        for chunk, future in submitted:
+            items_by_number = dict(chunk)
             try:
-                log.info("\nProcessing item {}/{}".format(i, len(items)))
-                if hasattr(item, 'find') and hasattr(item.find('title'), 'get_text'):
-                    title = item.find('title').get_text() if item.find('title') else ""
-                    description = item.find('description').get_text() if item.find('description') else ""
-                    link = item.find('link').get_text() if item.find('link') else ""
-                    pub_date = item.find('pubDate').get_text() if item.find('pubDate') else ""
-                    category = item.find('category').get_text() if item.find('category') else ""
-                else:
-                    log.warning(f"Error parsing item in feed, skipping")
-                    continue
-                #TODO: Update to include cancelled events in seperate JSON
-                if title.find("CANCELLED") != -1:
-                    log.info(f"Event cancelled, skipping")
-                    continue
-                
-                log.info("Title: {}".format(title[:60]))
-
-                original_description = description
-                if description:
-                    desc_soup = BeautifulSoup(description, 'html.parser')
-                    description = desc_soup.get_text(separator=' ', strip=True)
-
-                event_date = extract_event_date(category, original_description)
-                if event_date:
-                    if event_date < datetime.today():
-                        log.info(f"Skipping past event: {event_date.date()}")
-                        continue
-                else:
-                    print(f"Could not parse date, including anyway")
-
-                time = extract_event_times(original_description)
-                found_price  = get_cost(description)
-                kid_friendly = is_kid_friendly_event(original_description)
-                cleaned_description = clean_event_description(original_description)
-                event_url = link.strip() if link else rss_url
-
-                virtual = is_virtual(original_description)
-                if not virtual:
-                    location = extract_venue_and_location_from_rss(description)
-                else:
-                    location = ("Virtual", "Virutal")
-                
-                price = None
-                if found_price is not None:
-                    price = found_price
-                
-                if price is None:
-                    pricing_link = extract_price_link_from_description(original_description)
-                    if pricing_link:
-                        log.info(f"Found Smithsonian Associates pricing link")
-                        scraped_price = scrape_smithsonian_associates_price(pricing_link)
-                        if scraped_price:
-                            price = scraped_price
-                    elif not price or "check website" in price.lower():
-                        log.warning(f"No pricing link found!")
-                        event_url = link.strip() if link else ""
-                        if event_url and 'eventbrite' not in event_url.lower():
-                            log.info("Attempting to scrape price from: {}".format(event_url))
-                            scraped_price = scrape_website_for_price(event_url)
-                            if scraped_price:
-                                price = scraped_price
-                
-                workshop_data = {
-                    'url': event_url.strip(),
-                    'scraped_at': scraped_at,
-                    'title': title.strip(),
-                    'description': cleaned_description.strip() if cleaned_description else title.strip(),
-                    'date': event_date.strftime("%Y-%m-%d"),
-                    'time': time,
-                    'price': float(price) if price is not None else None,
-                    'location': location[1].strip(),
-                    'venue': location[0].strip(),
-                    'kidfriendly': kid_friendly,
-                    'submittedBy': "scraper_smithsonian",
-                    "business": "Smithsonian"
-                }
-                
-                workshops.append(workshop_data)
-                log.info("Added workshop: {}".format(title[:50]))
-                
-            except Exception as e:
-                log.warning(f"Error processing item {i}: {e}")
+                results, snapshot = future.result(timeout=deadline.remaining())
+            except (FutureTimeout, CancelledError):
+                if not expired:
+                    log.warning("Deadline of %ss reached, dropping items %s onwards", deadline.seconds, chunk[0][0])
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    expired = True
+                if seen_index is not None:
+                    for item in items_by_number.values():
+                        seen_index.discard(SOURCE_NAME, item)
                 continue
+            except Exception as e:
+                log.warning("Error parsing items %s-%s: %s", chunk[0][0], chunk[-1][0], e)
+                results = [(i, None, str(e)) for i, _ in chunk]
+            else:
+                metrics.merge(snapshot)
+            for i, result, error in results:
+                if error is not None:
+                    log.warning("Error processing item %s: %s", i, error)
+                    metrics.count("items_skipped", SOURCE_NAME, reason="error")
+                    if seen_index is not None:
+                        seen_index.discard(SOURCE_NAME, items_by_number[i])
+                elif result:
+                    parsed.append((i,) + result)
+    return parsed
+
+"""
+Fills in the scraped prices and writes the parsed workshops to emit, in feed
+order. A workshop that does not fit the schema is logged and skipped, so one
+bad record does not stop the rest
+Returns the number of workshops written
+"""
+def emit_workshops(parsed, scraped_prices, emit):
+    emitted = 0
+    for i, workshop_data, price_job in parsed:
+        try:
+            if price_job and scraped_prices.get(price_job):
+                workshop_data.price = scraped_prices[price_job]
+            price = workshop_data.price
+            workshop_data.price = float(price) if price is not None else None
+        except Exception as e:
+            log.warning("Error processing item %s: %s", i, e)
+            metrics.count("items_skipped", SOURCE_NAME, reason="error")
+            continue
+        problems = workshop_data.validate()
+        if problems:
+            log.warning("Dropping invalid workshop from item %s, %s: %s", i, workshop_data.title, ", ".join(problems))
+            metrics.count("items_skipped", SOURCE_NAME, reason="invalid")
+            continue
+        with metrics.stage("output", SOURCE_NAME):
+            emit(workshop_data)
+        metrics.count("items_emitted", SOURCE_NAME)
+        emitted += 1
+        item_log.debug("Added workshop: %s", workshop_data.title[:50])
+    return emitted
+
+"""
+Splits a budget of max_workers across the pools of one scrape. The shard
+fetch threads and parse processes run at the same time and share it, the
+parse pool getting what the shard fetches leave, or parsing in this process
+when that is under two. Prices are resolved once both pools have shut
+down, so the price pool gets the whole budget
+Returns (shard workers, parse workers, price workers)
+"""
+def split_workers(max_workers, parse_workers=PARSE_WORKERS):
+    max_workers = max(1, max_workers)
+    shard_workers = max(1, min(SHARD_FETCH_WORKERS, max_workers // 2))
+    if parse_workers:
+        parse_workers = min(parse_workers, max_workers - shard_workers)
+        if parse_workers < 2:
+            parse_workers = 0
+    return shard_workers, parse_workers, max_workers
+
+"""
+Extracts and builds a Workshop for all items found in the RSS feed
+When a sink is given each workshop is written to it once complete instead of being collected.
+max_workers, when given, caps the threads and processes of all the pools, see
+split_workers. Once deadline (seconds or a Deadline) expires no more items are
+read or prices looked up, and what was parsed by then is written
+Returns list of Workshop records, empty when a sink is given
+"""
+def scrape_smithsonian_rss(stream=STREAM_RSS, seen_index=None, sink=None, price_workers=PRICE_FETCH_WORKERS,
+                           parse_workers=PARSE_WORKERS, parse_chunk_size=PARSE_CHUNK_SIZE,
+                           horizon_days=HORIZON_DAYS, shard_size=SHARD_SIZE, venues=None,
+                           max_workers=None, deadline=None):
+    rss_url = RSS_URL
+    scraped_at = datetime.now().isoformat()
+    filters = smithsonian_filters(seen_index, horizon_days, venues)
+    deadline = as_deadline(deadline)
+    shard_workers = SHARD_FETCH_WORKERS
+    if max_workers:
+        shard_workers, parse_workers, price_workers = split_workers(max_workers, parse_workers)
+    workshops = []
+    emit = sink.write if sink is not None else workshops.append
+    
+    try:
+        log.info("Fetching Smithsonian RSS feed...")
+
+        if horizon_days:
+            parsed = _parse_items(fetch_sharded_items(horizon_days, shard_size, stream, shard_workers, deadline), rss_url,
+                                  scraped_at, seen_index, parse_workers, parse_chunk_size, filters, deadline)
+        else:
+            try:
+                parsed = _parse_items(fetch_smithsonian_items(rss_url, stream, deadline), rss_url, scraped_at, seen_index,
+                                      parse_workers, parse_chunk_size, filters, deadline)
+            except ET.ParseError as e:
+                if not stream:
+                    raise
+                log.warning("Streaming RSS parse failed, parsing the full feed instead: %s", e)
+                parsed = _parse_items(fetch_smithsonian_items(rss_url, False, deadline), rss_url, scraped_at, seen_index,
+                                      parse_workers, parse_chunk_size, filters, deadline)
+
+        with metrics.stage("price_scrape", SOURCE_NAME):
+            scraped_prices = resolve_prices([price_job for _, _, price_job in parsed if price_job], price_workers, deadline)
+
+        emitted = emit_workshops(parsed, scraped_prices, emit)
         
-        log.info("Extracted {} future workshops from Smithsonian RSS".format(len(workshops)))
+        log.info("Extracted %s future workshops from Smithsonian RSS", emitted)
         
+    except DeadlineExceeded as e:
+        log.warning("%s before the RSS feed was fetched", e)
     except requests.exceptions.RequestException as e:
-        log.warning(f"Error fetching RSS feed: {e}")
+        log.warning("Error fetching RSS feed: %s", e)
     except Exception as e:
-        log.warning(f"Error parsing RSS feed: {e}")
-        traceback.print_exc()
+        log.warning("Error parsing RSS feed: %s", e)
+        log.debug("Full traceback:", exc_info=True)
     
     return workshops
 
 """
-Saves the workshop data into a JSON file
+The Smithsonian Trumba feed as a source for the multi-source runner
+"""
+@register_source
+class SmithsonianSource(Source):
+    name = SOURCE_NAME
+
+    def scrape(self, sink, seen_index=None, max_workers=None, deadline=None):
+        scrape_smithsonian_rss(seen_index=seen_index, sink=sink, max_workers=max_workers, deadline=deadline)
+
+"""
+Saves the workshop data into a compact JSON array file, atomically
 Returns boolean if successful
 """
 def save_to_json(workshops, filename="smithsonian_workshops.json"):
-    """Save workshops data to JSON file"""
+    sink = WorkshopSink(filename, format="json")
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(workshops, f, indent=2, ensure_ascii=False)
-        log.info("\nSaved {} workshops to {}".format(len(workshops), filename))
-        return True
+        for workshop in workshops:
+            sink.write(workshop)
     except Exception as e:
-        log.warning(f"Error saving to JSON: {e}")
+        log.warning("Error saving to JSON: %s", e)
+        sink.abort()
         return False
+    return sink.close()
 
-def main():
-    workshops = scrape_smithsonian_rss()
-    
-    if workshops:
-        log.info("Found {} future workshops:".format(len(workshops)))
-        save_to_json(workshops)
-        log.info("Total events added: {}".format(len(workshops)))   
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Scrape Smithsonian workshops from the Trumba RSS feed")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="skip items unchanged since the last run and save only new or changed workshops")
+    arg_parser.add_argument("--seen-index", default=DEFAULT_SEEN_INDEX_PATH,
+                            help="seen items index used by --incremental")
+    arg_parser.add_argument("--format", choices=FORMATS, default="ndjson",
+                            help="write one workshop per line (ndjson) or a single compact JSON array (json)")
+    arg_parser.add_argument("--db", metavar="PATH",
+                            help="upsert workshops into this SQLite database instead of writing a file")
+    arg_parser.add_argument("--report", metavar="PATH",
+                            help="write per-stage timings and item counters for the run to this JSON file")
+    arg_parser.add_argument("--prometheus", metavar="PATH",
+                            help="write the same metrics in Prometheus text format to this file")
+    arg_parser.add_argument("--horizon-days", type=int, default=HORIZON_DAYS,
+                            help="days ahead to request from Trumba, 0 requests the feed's default window in one go")
+    arg_parser.add_argument("--shard", choices=SHARD_SIZES, default=SHARD_SIZE,
+                            help="fetch the window as parallel per-week or per-month feeds")
+    arg_parser.add_argument("--venues", nargs="+", metavar="NAME",
+                            help="only keep events at a venue whose name contains one of these")
+    arg_parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                            help="parse feed items on this many worker processes, 0 parses them in this process")
+    arg_parser.add_argument("--parse-chunk-size", type=int, default=PARSE_CHUNK_SIZE,
+                            help="feed items sent to a worker process at a time")
+    add_verbosity_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    configure_logging(args.verbose, args.quiet)
+
+    seen_index = SeenIndex(args.seen_index) if args.incremental else None
+    base = "smithsonian_workshops_delta" if seen_index else "smithsonian_workshops"
+    if args.db:
+        sink = WorkshopStore(args.db)
+    else:
+        sink = WorkshopSink(output_filename(base, args.format), format=args.format)
+    scrape_smithsonian_rss(seen_index=seen_index, sink=sink,
+                           parse_workers=args.parse_workers, parse_chunk_size=args.parse_chunk_size,
+                           horizon_days=args.horizon_days, shard_size=args.shard, venues=args.venues)
+    saved = sink.close()
+
+    if sink.count:
+        log.info("Total events added: %s", sink.count)
     else:
         log.warning("No workshops found.")
 
+    if seen_index is not None:
+        # Only remember the items once the delta holding them is on disk
+        if saved:
+            seen_index.commit()
+        seen_index.close()
+
+    log_timing_summary()
+    metrics.save(args.report, args.prometheus)
+    item_log.summary()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
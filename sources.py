@@ -0,0 +1,36 @@
+import logging
+
+log = logging.getLogger("sources")
+
+_registry = {}
+
+"""
+A feed of workshops the runner can scrape. Subclasses set name and
+implement scrape(), writing each workshop to sink as it is produced.
+max_workers is this source's share of the runner's concurrency budget, and
+deadline, in seconds or a deadline.Deadline, when it should stop and write
+what it has. The runner kills its process if it has not finished shortly after
+"""
+class Source:
+    name = None
+    timeout = 300
+
+    def scrape(self, sink, seen_index=None, max_workers=None, deadline=None):
+        raise NotImplementedError
+
+"""
+Class decorator adding a Source to the registry, keyed by its name
+"""
+def register_source(cls):
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} has no name")
+    if cls.name in _registry and _registry[cls.name] is not cls:
+        log.warning("Replacing registered source %s", cls.name)
+    _registry[cls.name] = cls
+    return cls
+
+"""
+Returns the registered Source classes by name, in registration order
+"""
+def registered_sources():
+    return dict(_registry)
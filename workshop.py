@@ -0,0 +1,145 @@
+import json
+import re
+import sys
+
+# The one schema every source produces, in output order
+FIELDS = (
+    "url", "scraped_at", "title", "description", "date", "time", "end_time",
+    "price", "location", "venue", "kidfriendly", "submittedBy", "business", "source"
+)
+REQUIRED = ("title", "date")
+# Values repeated across most records of a run, interned so they share one string
+INTERNED = ("scraped_at", "location", "venue", "submittedBy", "business", "source")
+
+_date = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_time = re.compile(r'^\d{2}:\d{2}(:\d{2})?$')
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+"""
+One scraped workshop, as a slotted record rather than a dict per event.
+Supports workshop['title'], workshop.get('title') and dict(workshop), so
+code written against the old workshop dicts keeps working
+"""
+class Workshop:
+    __slots__ = FIELDS
+
+    def __init__(self, url, title, date, scraped_at=None, description=None, time=None, end_time=None,
+                 price=None, location=None, venue=None, kidfriendly=False, submittedBy=None,
+                 business=None, source=None):
+        self.url = url
+        self.scraped_at = _intern(scraped_at)
+        self.title = title
+        self.description = description
+        self.date = date
+        self.time = time
+        self.end_time = end_time
+        self.price = price
+        self.location = _intern(location)
+        self.venue = _intern(venue)
+        self.kidfriendly = kidfriendly
+        self.submittedBy = _intern(submittedBy)
+        self.business = _intern(business)
+        self.source = _intern(source)
+
+    """
+    Builds a Workshop from a dict in either scraper's older shape. A
+    (start, end) time pair is split into time and end_time, and price becomes a float
+    """
+    @classmethod
+    def from_dict(cls, data, source=None):
+        values = {field: data[field] for field in FIELDS if field in data}
+        time = values.get('time')
+        if isinstance(time, (list, tuple)):
+            values['time'], values['end_time'] = (list(time) + [None, None])[:2]
+        price = values.get('price')
+        values['price'] = float(price) if price is not None else None
+        if source is not None:
+            values['source'] = source
+        return cls(values.pop('url', None), values.pop('title', None), values.pop('date', None), **values)
+
+    def __getitem__(self, field):
+        if field not in FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in FIELDS:
+            raise KeyError(field)
+        setattr(self, field, _intern(value) if field in INTERNED else value)
+
+    def __contains__(self, field):
+        return field in FIELDS
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, Workshop):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"Workshop({self.title!r}, {self.date!r}, {self.url!r})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    """
+    Returns the workshop as one compact JSON object, as written to NDJSON and JSON array output
+    """
+    def to_json(self):
+        return _encoder.encode(self.to_dict())
+
+    """
+    Returns the workshop as a row in workshop_store.COLUMNS order. time is ''
+    rather than NULL when missing, as it is part of the store's key
+    """
+    def to_row(self):
+        price = self.price
+        return (
+            self.url or '',
+            self.date,
+            self.time or '',
+            self.end_time,
+            self.scraped_at,
+            self.title,
+            self.description,
+            float(price) if price is not None else None,
+            self.location,
+            self.venue,
+            bool(self.kidfriendly),
+            self.submittedBy,
+            self.business,
+        )
+
+    """
+    Checks the workshop against the schema
+    Returns a list of problems, empty when the workshop is valid
+    """
+    def validate(self):
+        problems = [f"missing {field}" for field in REQUIRED if not getattr(self, field)]
+        if self.date and not (isinstance(self.date, str) and _date.match(self.date)):
+            problems.append(f"date {self.date!r} is not YYYY-MM-DD")
+        for field in ('time', 'end_time'):
+            value = getattr(self, field)
+            if value is not None and not (isinstance(value, str) and _time.match(value)):
+                problems.append(f"{field} {value!r} is not HH:MM:SS")
+        if self.price is not None and (not isinstance(self.price, (int, float)) or self.price < 0):
+            problems.append(f"price {self.price!r} is not a non-negative number")
+        return problems
+
+"""
+Returns value as a Workshop, converting a workshop dict. source, when given, is set on the result
+"""
+def as_workshop(value, source=None):
+    if isinstance(value, Workshop):
+        if source is not None:
+            value.source = _intern(source)
+        return value
+    return Workshop.from_dict(value, source)
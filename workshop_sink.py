@@ -0,0 +1,109 @@
+import os
+import threading
+import logging
+from workshop import as_workshop
+
+log = logging.getLogger("workshop_sink")
+
+FORMATS = ("ndjson", "json")
+# Records written between flushes of the partial file
+FLUSH_EVERY = 50
+PARTIAL_SUFFIX = ".partial"
+
+"""
+Streams workshops to disk as they are produced, as NDJSON (one compact object
+per line) or a compact JSON array.
+Records go to '<path>.partial', which is renamed over path when the sink is
+closed, so readers never see a half written file at path. If a run dies the
+partial file keeps every record flushed so far. Nothing is created until the
+first write, so an empty run leaves no file behind, as before
+"""
+class WorkshopSink:
+    def __init__(self, path, format="ndjson", flush_every=FLUSH_EVERY):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown output format {format!r}, expected one of {FORMATS}")
+        self.path = path
+        self.format = format
+        self.flush_every = max(1, flush_every)
+        self.partial_path = path + PARTIAL_SUFFIX
+        self.count = 0
+        self.failed = False
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+        if self.format == "json":
+            self._file.write("[")
+
+    """
+    Writes one workshop, a Workshop or a workshop dict, safe to call from several threads
+    """
+    def write(self, workshop):
+        line = as_workshop(workshop).to_json()
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open()
+                if self.format == "json":
+                    line = ("," if self.count else "") + "\n" + line
+                else:
+                    line += "\n"
+                self._file.write(line)
+                self.count += 1
+                if self.count % self.flush_every == 0:
+                    self._file.flush()
+            except Exception:
+                self.failed = True
+                raise
+
+    """
+    Finishes the file and moves it into place
+    Returns boolean if the output is complete at path
+    """
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return not self.failed
+            try:
+                if not self.failed:
+                    if self.format == "json":
+                        self._file.write("\n]\n")
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                if self.failed:
+                    log.warning("Output incomplete, partial records left in %s", self.partial_path)
+                    return False
+                os.replace(self.partial_path, self.path)
+                log.info("Saved %s workshops to %s", self.count, self.path)
+                return True
+            except Exception as e:
+                self.failed = True
+                log.error("Could not save to file %s: %s", self.path, e)
+                return False
+
+    """
+    Closes the file without moving it into place, keeping the partial records
+    """
+    def abort(self):
+        with self._lock:
+            self.failed = True
+        return self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+"""
+Returns the output filename for a base name and format, e.g. 'smithsonian_workshops.ndjson'
+"""
+def output_filename(base, format="ndjson"):
+    return f"{base}.{format}"
@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import json
+import sys
+import argparse
+import logging
+from datetime import date
+from log_config import add_verbosity_arguments, configure_logging
+from workshop import as_workshop
+
+log = logging.getLogger("workshop_store")
+
+DEFAULT_STORE_PATH = "workshops.sqlite"
+# Rows buffered per executemany call
+BATCH_SIZE = 500
+
+# In Workshop.to_row order
+COLUMNS = (
+    "url", "date", "time", "end_time", "scraped_at", "title", "description",
+    "price", "location", "venue", "kidfriendly", "submitted_by", "business"
+)
+
+# Plain SQL that also runs on Postgres, apart from the ? placeholders.
+# time is '' rather than NULL for events without one, since NULLs never
+# conflict in a unique key
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS workshops (
+        url TEXT NOT NULL,
+        date DATE NOT NULL,
+        time TEXT NOT NULL DEFAULT '',
+        end_time TEXT,
+        scraped_at TEXT,
+        title TEXT NOT NULL,
+        description TEXT,
+        price REAL,
+        location TEXT,
+        venue TEXT,
+        kidfriendly BOOLEAN,
+        submitted_by TEXT,
+        business TEXT,
+        PRIMARY KEY (url, date, time)
+    )""",
+    "CREATE INDEX IF NOT EXISTS workshops_date ON workshops (date)",
+    "CREATE INDEX IF NOT EXISTS workshops_location ON workshops (location)",
+    "CREATE INDEX IF NOT EXISTS workshops_kidfriendly ON workshops (kidfriendly, date)",
+]
+
+UPSERT = (
+    f"INSERT INTO workshops ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    "ON CONFLICT (url, date, time) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[3:])
+)
+
+"""
+Flattens a workshop, a Workshop or a dict in either scraper's shape, into a row in COLUMNS order
+Raises ValueError for a workshop that does not fit the schema
+"""
+def workshop_row(workshop):
+    workshop = as_workshop(workshop)
+    problems = workshop.validate()
+    if problems:
+        raise ValueError(", ".join(problems))
+    return workshop.to_row()
+
+"""
+SQLite table of scraped workshops, upserted on url + date + start time so a
+rescrape updates events instead of duplicating them.
+Has the same write / close / count surface as workshop_sink.WorkshopSink, so
+the scrapers can stream straight into it. Rows are buffered and written in
+batches of batch_size with executemany
+"""
+class WorkshopStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self.failed = False
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(UPSERT, self._pending)
+        self._pending = []
+
+    """
+    Queues one workshop, writing the batch once it is full. Safe to call from several threads
+    """
+    def write(self, workshop):
+        row = workshop_row(workshop)
+        with self._lock:
+            try:
+                self._pending.append(row)
+                self.count += 1
+                if len(self._pending) >= self.batch_size:
+                    self._flush()
+            except Exception:
+                self.failed = True
+                raise
+
+    """
+    Upserts a list of workshops
+    Returns the number of workshops written
+    """
+    def upsert(self, workshops):
+        for workshop in workshops:
+            self.write(workshop)
+        with self._lock:
+            self._flush()
+        return len(workshops)
+
+    """
+    Returns upcoming workshops as dicts ordered by date and time, read through the indexes
+    """
+    def upcoming(self, from_date=None, kid_friendly=None, location=None, limit=None):
+        query = "SELECT * FROM workshops WHERE date >= ?"
+        params = [(from_date or date.today()).isoformat()]
+        if kid_friendly is not None:
+            query += " AND kidfriendly = ?"
+            params.append(bool(kid_friendly))
+        if location is not None:
+            query += " AND location = ?"
+            params.append(location)
+        query += " ORDER BY date, time"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    """
+    Writes any buffered rows and closes the database
+    Returns boolean if every workshop was stored
+    """
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return not self.failed
+            try:
+                if not self.failed:
+                    self._flush()
+                    log.info("Stored %s workshops in %s", self.count, self.path)
+            except Exception as e:
+                self.failed = True
+                log.error("Could not store workshops in %s: %s", self.path, e)
+            self._conn.close()
+            self._conn = None
+            return not self.failed
+
+    def abort(self):
+        with self._lock:
+            self.failed = True
+            self._pending = []
+        return self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+"""
+Reads workshops from a scraper output file, NDJSON or a JSON array
+"""
+def read_workshops(filename):
+    with open(filename, encoding='utf-8') as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Load scraped workshop files into the SQLite workshop store")
+    arg_parser.add_argument("files", nargs="+", help="NDJSON or JSON files written by the scrapers")
+    arg_parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="SQLite database to upsert into")
+    add_verbosity_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+    configure_logging(args.verbose, args.quiet)
+
+    with WorkshopStore(args.db) as store:
+        for filename in args.files:
+            before = store.count
+            for workshop in read_workshops(filename):
+                try:
+                    store.write(workshop)
+                except (KeyError, TypeError, ValueError) as e:
+                    log.warning("Skipping malformed workshop in %s: %s", filename, e)
+            log.info("Loaded %s workshops from %s", store.count - before, filename)
+    return 0 if not store.failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())